@@ -2,8 +2,6 @@
 
 from matplotlib.pyplot import axis
 import streamlit as st  # streamlit library
-import pandas as pd  # pandas library
-import yfinance as yf  # yfinance library
 import datetime  # datetime library
 from datetime import date
 from plotly import graph_objs as go  # plotly library
@@ -12,8 +10,13 @@ from prophet import Prophet  # prophet library
 # plotly library for prophet model plotting
 from prophet.plot import plot_plotly
 import time  # time library
+import uuid
 from streamlit_option_menu import option_menu  # select_options library
 import testin
+import market_data  # cached yfinance access shared by all sessions
+import ticker_registry
+import decimate  # shrinks chart data to the pixel width
+import profiling
 import datetime
 # In main_file
 import screener
@@ -25,6 +28,8 @@ import screener
 
 st.set_page_config(layout="wide", initial_sidebar_state="expanded")
 
+CHART_WIDTH = 1200  # target pixel width, charts are decimated to about this many points
+
 def add_meta_tag():
     meta_tag = """
         <head>
@@ -48,15 +53,18 @@ with st.sidebar:
 start = st.sidebar.date_input(
     'Start', datetime.date(2022, 1, 1))  # start date input
 end = st.sidebar.date_input('End', datetime.date.today())  # end date input
+debug = st.sidebar.checkbox('Debug panel')  # per-stage timings and peak memory of this rerun
+# keyed by session, Streamlit may run a session's reruns on different threads
+profiling.start_rerun(trace_memory=debug, session=st.session_state.setdefault('profiling_session', uuid.uuid4().hex))
 # Sidebar Section Ends Here
 
-# read csv file
-stock_df = pd.read_csv("StockStreamTickersData.csv")
+# tickers are loaded and indexed once per process, shared by every session
+registry = ticker_registry.get_registry()
 
 # Stock Performance Comparison Section Starts Here
 if(selected == 'Stocks Performance Comparison'):  # if user selects 'Stocks Performance Comparison'
     st.subheader("Stocks Performance Comparison")
-    tickers = stock_df["Company Name"]
+    tickers = registry.names
     # dropdown for selecting assets
     dropdown = st.multiselect('Pick your assets', tickers)
 
@@ -64,28 +72,20 @@ if(selected == 'Stocks Performance Comparison'):  # if user selects 'Stocks Perf
         time.sleep(2)
         # st.success('Loaded')
 
-    dict_csv = pd.read_csv('StockStreamTickersData.csv', header=None, index_col=0).to_dict()[1]  # read csv file
-    symb_list = []  # list for storing symbols
-    for i in dropdown:  # for each asset selected
-        val = dict_csv.get(i)  # get symbol from csv file
-        symb_list.append(val)  # append symbol to list
-
-    def relativeret(df):  # function for calculating relative return
-        rel = df.pct_change()  # calculate relative return
-        cumret = (1+rel).cumprod() - 1  # calculate cumulative return
-        cumret = cumret.fillna(0)  # fill NaN values with 0
-        return cumret  # return cumulative return
+    symb_list = [registry.symbol_for(i) for i in dropdown]  # symbols of the selected assets
 
     if len(dropdown) > 0:  # if user selects atleast one asset
-        df = relativeret(yf.download(symb_list, start, end))[
-            'Adj Close']  # download data from yfinance
-        # download data from yfinance
-        raw_df = relativeret(yf.download(symb_list, start, end))
-        raw_df.reset_index(inplace=True)  # reset index
-
-        closingPrice = yf.download(symb_list, start, end)[
-            'Adj Close']  # download data from yfinance
-        volume = yf.download(symb_list, start, end)['Volume']
+        # one cached download per window; returns, close and volume are slices of it
+        with profiling.stage('comparison', 'fetch', tickers=len(symb_list)) as rec:
+            # cache hits, and windows another session is downloading, fetch nothing here
+            window = market_data.get_window(symb_list, start, end,
+                                            on_fetch=lambda w: rec.add_bytes(profiling.frame_bytes(w.frame)))
+        with profiling.stage('comparison', 'compute'):
+            # thinned to about one point per pixel before anything is sent to the browser,
+            # once per window and width, so a chart-type change reuses them
+            df = window.chart('returns', CHART_WIDTH)  # cumulative relative returns
+            closingPrice = window.chart('close', CHART_WIDTH)  # adjusted closing price
+            volume = window.chart('volume', CHART_WIDTH)
         
         # display raw data
         chart = ('Line Chart', 'Area Chart', 'Bar Chart')  # chart types
@@ -94,48 +94,50 @@ if(selected == 'Stocks Performance Comparison'):  # if user selects 'Stocks Perf
         with st.spinner('Loading...'):  # spinner while loading
             time.sleep(2)
 
-        st.subheader('Relative Returns {}'.format(dropdown))
+        with profiling.stage('comparison', 'render', chart=dropdown1):
+            st.subheader('Relative Returns {}'.format(dropdown))
+            st.dataframe(window.panel.summary())  # return, drawdown and volatility per asset
                 
-        if (dropdown1) == 'Line Chart':  # if user selects 'Line Chart'
-            st.line_chart(df)  # display line chart
-            # display closing price of selected assets
-            st.write("### Closing Price of {}".format(dropdown))
-            st.line_chart(closingPrice)  # display line chart
-
-            # display volume of selected assets
-            st.write("### Volume of {}".format(dropdown))
-            st.line_chart(volume)  # display line chart
-
-        elif (dropdown1) == 'Area Chart':  # if user selects 'Area Chart'
-            st.area_chart(df)  # display area chart
-            # display closing price of selected assets
-            st.write("### Closing Price of {}".format(dropdown))
-            st.area_chart(closingPrice)  # display area chart
-
-            # display volume of selected assets
-            st.write("### Volume of {}".format(dropdown))
-            st.area_chart(volume)  # display area chart
-
-        elif (dropdown1) == 'Bar Chart':  # if user selects 'Bar Chart'
-            st.bar_chart(df)  # display bar chart
-            # display closing price of selected assets
-            st.write("### Closing Price of {}".format(dropdown))
-            st.bar_chart(closingPrice)  # display bar chart
-
-            # display volume of selected assets
-            st.write("### Volume of {}".format(dropdown))
-            st.bar_chart(volume)  # display bar chart
-
-        else:
-            st.line_chart(df, width=1000, height=800,
-                          use_container_width=False)  # display line chart
-            # display closing price of selected assets
-            st.write("### Closing Price of {}".format(dropdown))
-            st.line_chart(closingPrice)  # display line chart
-
-            # display volume of selected assets
-            st.write("### Volume of {}".format(dropdown))
-            st.line_chart(volume)  # display line chart
+            if (dropdown1) == 'Line Chart':  # if user selects 'Line Chart'
+                st.line_chart(df)  # display line chart
+                # display closing price of selected assets
+                st.write("### Closing Price of {}".format(dropdown))
+                st.line_chart(closingPrice)  # display line chart
+
+                # display volume of selected assets
+                st.write("### Volume of {}".format(dropdown))
+                st.line_chart(volume)  # display line chart
+
+            elif (dropdown1) == 'Area Chart':  # if user selects 'Area Chart'
+                st.area_chart(df)  # display area chart
+                # display closing price of selected assets
+                st.write("### Closing Price of {}".format(dropdown))
+                st.area_chart(closingPrice)  # display area chart
+
+                # display volume of selected assets
+                st.write("### Volume of {}".format(dropdown))
+                st.area_chart(volume)  # display area chart
+
+            elif (dropdown1) == 'Bar Chart':  # if user selects 'Bar Chart'
+                st.bar_chart(df)  # display bar chart
+                # display closing price of selected assets
+                st.write("### Closing Price of {}".format(dropdown))
+                st.bar_chart(closingPrice)  # display bar chart
+
+                # display volume of selected assets
+                st.write("### Volume of {}".format(dropdown))
+                st.bar_chart(volume)  # display bar chart
+
+            else:
+                st.line_chart(df, width=1000, height=800,
+                              use_container_width=False)  # display line chart
+                # display closing price of selected assets
+                st.write("### Closing Price of {}".format(dropdown))
+                st.line_chart(closingPrice)  # display line chart
+
+                # display volume of selected assets
+                st.write("### Volume of {}".format(dropdown))
+                st.line_chart(volume)  # display line chart
 
     else:  # if user doesn't select any asset
         st.write('Please select atleast one asset')  # display message
@@ -144,18 +146,16 @@ if(selected == 'Stocks Performance Comparison'):  # if user selects 'Stocks Perf
 # Real-Time Stock Price Section Starts Here
 elif(selected == 'Real-Time Stock Price'):  # if user selects 'Real-Time Stock Price'
     st.subheader("Real-Time Stock Price")
-    tickers = stock_df["Company Name"]  # get company names from csv file
+    # optional search box narrows the dropdown through the registry's index
+    query = st.text_input('Search company or symbol')
+    tickers = registry.search(query, limit=50) if query else registry.names
     # dropdown for selecting company
     a = st.selectbox('Pick a Company', tickers)
 
     with st.spinner('Loading...'):  # spinner while loading
             time.sleep(2)
 
-    dict_csv = pd.read_csv('StockStreamTickersData.csv', header=None, index_col=0).to_dict()[1]  # read csv file
-    symb_list = []  # list for storing symbols
-
-    val = dict_csv.get(a)  # get symbol from csv file
-    symb_list.append(val)  # append symbol to list
+    symb_list = [registry.symbol_for(a)]  # symbol of the selected company
 
     if "button_clicked" not in st.session_state:  # if button is not clicked
         st.session_state.button_clicked = False  # set button clicked to false
@@ -167,35 +167,40 @@ elif(selected == 'Real-Time Stock Price'):  # if user selects 'Real-Time Stock P
         st.button("Search", on_click=callback)  # button for searching data
         or st.session_state.button_clicked  # if button is clicked
     ):
-        if(a == ""):  # if user doesn't select any company
+        if(not a):  # if user doesn't select any company (or the search found nothing)
             st.write("Click Search to Search for a Company")
             with st.spinner('Loading...'):  # spinner while loading
              time.sleep(2)
         else:  # if user selects a company
             # download data from yfinance
-            data = yf.download(symb_list, start=start, end=end)
-            data.reset_index(inplace=True)  # reset index
+            with profiling.stage('realtime', 'fetch', ticker=symb_list[0]) as rec:
+                data = market_data.get_window(symb_list, start, end,
+                                              on_fetch=lambda w: rec.add_bytes(profiling.frame_bytes(w.frame))).frame
+            data = data.reset_index()  # reset index (copy, the cached frame stays untouched)
             st.subheader('Raw Data of {}'.format(a))  # display raw data
             st.write(data)  # display data
 
             def plot_raw_data():  # function for plotting raw data
                 fig = go.Figure()  # create figure
+                # LTTB-decimated copies, shape kept at a fraction of the payload
+                line = decimate.decimate_frame(data.set_index('Date')[['Open', 'Close']], CHART_WIDTH).reset_index()
                 fig.add_trace(go.Scatter(  # add scatter plot
-                    x=data['Date'], y=data['Open'], name="stock_open"))  # x-axis: date, y-axis: open
+                    x=line['Date'], y=line['Open'], name="stock_open"))  # x-axis: date, y-axis: open
                 fig.add_trace(go.Scatter(  # add scatter plot
-                    x=data['Date'], y=data['Close'], name="stock_close"))  # x-axis: date, y-axis: close
+                    x=line['Date'], y=line['Close'], name="stock_close"))  # x-axis: date, y-axis: close
                 fig.layout.update(  # update layout
                     title_text='Line Chart of {}'.format(a) , xaxis_rangeslider_visible=True)  # title, x-axis: rangeslider
                 st.plotly_chart(fig)  # display plotly chart
 
             def plot_candle_data():  # function for plotting candle data
                 fig = go.Figure()  # create figure
-                fig.add_trace(go.Candlestick(x=data['Date'],  # add candlestick plot
+                candles = decimate.resample_ohlc(data, CHART_WIDTH)  # wider candles for long ranges
+                fig.add_trace(go.Candlestick(x=candles['Date'],  # add candlestick plot
                                              # x-axis: date, open
-                                             open=data['Open'],
-                                             high=data['High'],  # y-axis: high
-                                             low=data['Low'],  # y-axis: low
-                                             close=data['Close'], name='market data'))  # y-axis: close
+                                             open=candles['Open'],
+                                             high=candles['High'],  # y-axis: high
+                                             low=candles['Low'],  # y-axis: low
+                                             close=candles['Close'], name='market data'))  # y-axis: close
                 fig.update_layout(  # update layout
                     title='Candlestick Chart of {}'.format(a),  # title
                     yaxis_title='Stock Price',  # y-axis: title
@@ -207,12 +212,13 @@ elif(selected == 'Real-Time Stock Price'):  # if user selects 'Real-Time Stock P
             dropdown1 = st.selectbox('Pick your chart', chart)
             with st.spinner('Loading...'):  # spinner while loading
              time.sleep(2)
-            if (dropdown1) == 'Candle Stick':  # if user selects 'Candle Stick'
-                plot_candle_data()  # plot candle data
-            elif (dropdown1) == 'Line Chart':  # if user selects 'Line Chart'
-                plot_raw_data()  # plot raw data
-            else:  # if user doesn't select any chart
-                plot_candle_data()  # plot candle data
+            with profiling.stage('realtime', 'render', chart=dropdown1):
+                if (dropdown1) == 'Candle Stick':  # if user selects 'Candle Stick'
+                    plot_candle_data()  # plot candle data
+                elif (dropdown1) == 'Line Chart':  # if user selects 'Line Chart'
+                    plot_raw_data()  # plot raw data
+                else:  # if user doesn't select any chart
+                    plot_candle_data()  # plot candle data
 
 # Real-Time Stock Price Section Ends Here
 
@@ -220,7 +226,8 @@ elif(selected == 'Real-Time Stock Price'):  # if user selects 'Real-Time Stock P
 elif(selected == 'Stock Prediction'):  # if user selects 'Stock Prediction'
     st.subheader("Stock Prediction")
     # main.py
-    testin.run_lstm_forecasting(ticker='TRIDENT.NS')
+    with profiling.stage('prediction', 'total'):
+        testin.run_lstm_forecasting(ticker='TRIDENT.NS')
 
 elif(selected=="Stocks"):
     screener.analyze_stock_data()
@@ -237,3 +244,6 @@ elif(selected == 'About'):
     """, unsafe_allow_html=True)
     
     st.markdown('<p class="big-font">StockStream is a web application that allows users to visualize Stock Performance Comparison, Real-Time Stock Prices and Stock Price Prediction. This application is developed using Streamlit. Streamlit is an open source app framework in Python language. It helps users to create web apps for Data Science and Machine Learning in a short time..<br> Cheers!</p>', unsafe_allow_html=True)
+
+if debug:  # sidebar debug panel, drawn last so it covers the whole rerun
+    profiling.render_panel(st)
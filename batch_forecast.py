@@ -0,0 +1,212 @@
+# BATCH FORECAST
+# Overnight next-day forecasts for every symbol in symbols.csv.
+#
+#   python batch_forecast.py [--group-size 64] [--workers N] [--out forecasts.npy]
+#
+# Tickers are split into groups and each group goes to a worker process (one per
+# CPU core). A worker trains one LSTM on the windows of all tickers in its group,
+# each ticker scaled by its own training range, and then scores the validation
+# bars and forecasts the next day for the whole group in batched model.predict
+# calls. Results land in a small structured .npy table that the Stock Prediction
+# page reads directly, so users see a forecast without waiting for a fit. A
+# row's forecast comes from its group's shared model, not a per-ticker fit.
+import argparse
+import datetime as dt
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import lstm_dataset
+from price_store import PriceStore
+
+FORECAST_TABLE = 'forecasts.npy'
+STORE_ROOT = 'stock_data'
+SESSION_CLOSE = dt.time(15, 30)  # NSE close; the server is expected to run on exchange time
+PARAMS = {'window': 60, 'epochs': 1, 'batch_size': 256, 'valid_days': 365, 'years': 5}
+
+_tables = {}  # path -> (mtime, {symbol: row}) of the last read
+_tables_lock = threading.Lock()
+
+TABLE_DTYPE = np.dtype([
+    ('symbol', 'U24'),
+    ('last_date', 'datetime64[D]'),
+    ('last_close', 'f4'),
+    ('forecast', 'f4'),
+    ('val_mae', 'f4'),
+    ('generated', 'datetime64[s]'),
+])
+
+
+def build_lstm(window, units=50):
+    # same network as the interactive page
+    from keras.models import Sequential
+    from keras.layers import Dense, LSTM
+    model = Sequential()
+    model.add(LSTM(units=units, return_sequences=True, input_shape=(window, 1)))
+    model.add(LSTM(units=units))
+    model.add(Dense(1))
+    model.compile(loss='mean_squared_error', optimizer='adam')
+    return model
+
+
+def _init_worker():
+    # one process per core, so keep tensorflow from spreading each over every core
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _load_group(symbols, params, store_root):
+    store = PriceStore(store_root)
+    end = dt.date.today()
+    start = end - dt.timedelta(days=params['years'] * 365)
+    window = params['window']
+    series = []
+    for symbol in symbols:
+        try:
+            df = store.read(symbol, start, end)
+        except Exception as e:
+            print(f"Error loading data for {symbol}: {e}")
+            continue
+        if 'Close' not in df.columns:
+            continue
+        closes = lstm_dataset.close_buffer(df['Close'])
+        dates = df.index.values
+        valid = ~np.isnan(closes)
+        closes, dates = np.ascontiguousarray(closes[valid]), dates[valid]
+        if len(closes) < 3 * window:
+            continue  # newly listed, not enough history to train on
+        split = lstm_dataset.split_index(dates, valid_days=params['valid_days'])
+        if split <= window or split >= len(closes):
+            continue
+        series.append((symbol, dates, closes, split))
+    return series
+
+
+def forecast_group(symbols, params=PARAMS, store_root=STORE_ROOT):
+    series = _load_group(symbols, params, store_root)
+    if not series:
+        return []
+    window = params['window']
+
+    # per-ticker min/max scaling fitted on the training bars
+    scaled, lows, spans = [], [], []
+    for _, _, closes, split in series:
+        lo, hi = float(closes[:split].min()), float(closes[:split].max())
+        span = hi - lo or 1.0
+        scaled.append(lstm_dataset.close_buffer((closes - lo) / span))
+        lows.append(lo)
+        spans.append(span)
+    lows, spans = np.array(lows, np.float32), np.array(spans, np.float32)
+
+    # training windows of every ticker in the group, stacked into one array
+    x_train, y_train, x_valid, owner = [], [], [], []
+    for k, (buf, (_, _, _, split)) in enumerate(zip(scaled, series)):
+        x, y = lstm_dataset.windows(buf[:split], window)
+        x_train.append(x)
+        y_train.append(y)
+        xv, _ = lstm_dataset.windows(buf[split - window:], window)
+        x_valid.append(xv)
+        owner.append(np.full(len(xv), k))
+    x_train = np.concatenate(x_train)[..., None]
+    y_train = np.concatenate(y_train)
+    x_valid = np.concatenate(x_valid)[..., None]
+    owner = np.concatenate(owner)
+
+    model = build_lstm(window)
+    model.fit(x_train, y_train, epochs=params['epochs'], batch_size=params['batch_size'],
+              shuffle=True, verbose=0)
+
+    # validation error for the whole group in one predict call
+    pred_valid = model.predict(x_valid, batch_size=1024, verbose=0)[:, 0]
+    pred_valid = pred_valid * spans[owner] + lows[owner]
+    actual_valid = np.concatenate([closes[split:] for _, _, closes, split in series])
+    mae = np.bincount(owner, np.abs(pred_valid - actual_valid)) / np.bincount(owner)
+
+    # next-day forecast: the last window of every ticker, again one call
+    last = np.stack([buf[-window:] for buf in scaled])[..., None]
+    forecast = model.predict(last, batch_size=1024, verbose=0)[:, 0] * spans + lows
+
+    generated = np.datetime64(dt.datetime.now().replace(microsecond=0), 's')
+    return [
+        (symbol, dates[-1].astype('datetime64[D]'), closes[-1], forecast[k], mae[k], generated)
+        for k, (symbol, dates, closes, _) in enumerate(series)
+    ]
+
+
+def write_table(rows, path=FORECAST_TABLE):
+    table = np.array(sorted(rows, key=lambda row: row[0]), dtype=TABLE_DTYPE)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        np.save(f, table)
+    os.replace(tmp, path)  # the page never sees a half-written table
+    return table
+
+
+def read_table(path=FORECAST_TABLE):
+    # {symbol: row} of the last batch run, empty if it has not run yet; loaded again only when the file changes
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    with _tables_lock:
+        held = _tables.get(path)
+        if held is not None and held[0] == mtime:
+            return held[1]
+    rows = {row['symbol']: row for row in np.load(path)}
+    with _tables_lock:
+        _tables[path] = (mtime, rows)
+    return rows
+
+
+def last_close(now=None):
+    # when the last completed weekday session closed, in local time like the `generated` column
+    now = now or dt.datetime.now()
+    day = np.datetime64(now.date(), 'D')
+    if not (np.is_busday(day) and now.time() >= SESSION_CLOSE):
+        day = np.busday_offset(day - 1, 0, roll='backward')
+    return np.datetime64(dt.datetime.combine(day.astype(dt.date), SESSION_CLOSE), 's')
+
+
+def is_current(row, now=None):
+    # generated after the last close: the store never holds the running day's bar, so a run on
+    # the evening of day D has data up to D - 1 and is still the newest until D + 1 closes
+    return row['generated'] >= last_close(now)
+
+
+def run(symbols, group_size=64, workers=None, out=FORECAST_TABLE, params=PARAMS, store_root=STORE_ROOT):
+    workers = workers or os.cpu_count() or 1
+    groups = [symbols[i:i + group_size] for i in range(0, len(symbols), group_size)]
+    rows = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(forecast_group, g, params, store_root) for g in groups]
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                rows.extend(future.result())
+            except Exception as e:
+                print(f"Error forecasting a group: {e}")
+            print(f"{done}/{len(groups)} groups, {len(rows)} forecasts, "
+                  f"{time.perf_counter() - started:.1f}s")
+    return write_table(rows, out)
+
+
+def main():
+    import ticker_registry
+    parser = argparse.ArgumentParser(description='Next-day LSTM forecasts for the whole symbols.csv universe')
+    parser.add_argument('--group-size', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default=FORECAST_TABLE)
+    args = parser.parse_args()
+    symbols = list(ticker_registry.get_nse_symbols().symbols)
+    table = run(symbols, args.group_size, args.workers, args.out)
+    print(f"Wrote {len(table)} forecasts to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+# BENCHMARKS
+# Timings for the backtest, screening and forecasting hot paths on synthetic
+# data, so speedups and regressions can be measured without network access.
+#
+#   python benchmarks.py [--preset quick|full] [--only utils.macd core.macd_fast ...]
+#                        [--save-baseline] [--tolerance 0.2] [--fail-on-regression]
+#
+# Prices are geometric Brownian motion OHLCV bars. Every case runs over a range
+# of bar counts (one symbol) and/or symbol counts (SCREEN_BARS bars each, about
+# five years of daily data like the screens). Each measurement keeps the best of
+# a few repeats, the bars/s throughput and the peak traced memory of one extra
+# run. Runs are appended to benchmarks/history.json and compared against
+# benchmarks/baseline.json when it exists; both are per machine and not
+# committed. Cases whose dependencies are not
+# installed (talib, tensorflow, test2's imports) are recorded as skipped.
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'ema-backtests'))
+
+BENCH_DIR = os.path.join(ROOT, 'benchmarks')
+HISTORY_PATH = os.path.join(BENCH_DIR, 'history.json')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+SCREEN_BARS = 1250
+BUDGET = 100000
+PRESETS = {
+    'quick': {'bars': (1_000, 10_000), 'symbols': (1, 50)},
+    'full': {'bars': (1_000, 10_000, 100_000, 1_000_000), 'symbols': (1, 50, 500, 2000)},
+}
+
+
+# synthetic data
+
+def gbm_ohlcv(n_bars, n_symbols=1, seed=0, s0=100.0, mu=0.08, sigma=0.25, bars_per_year=252):
+    # {column: (n_symbols, n_bars) float64 array} of GBM bars in the yfinance layout
+    rng = np.random.default_rng(seed)
+    dt_ = 1.0 / bars_per_year
+    steps = rng.normal((mu - 0.5 * sigma ** 2) * dt_, sigma * np.sqrt(dt_), (n_symbols, n_bars))
+    close = s0 * np.exp(np.cumsum(steps, axis=1))
+    gap = rng.normal(0, 0.2 * sigma * np.sqrt(dt_), (n_symbols, n_bars))
+    open_ = np.concatenate([np.full((n_symbols, 1), s0), close[:, :-1]], axis=1) * np.exp(gap)
+    wick = np.abs(rng.normal(0, 0.5 * sigma * np.sqrt(dt_), (2, n_symbols, n_bars)))
+    return {
+        'Open': open_,
+        'High': np.maximum(open_, close) * np.exp(wick[0]),
+        'Low': np.minimum(open_, close) * np.exp(-wick[1]),
+        'Close': close,
+        'Adj Close': close,
+        'Volume': np.floor(rng.lognormal(13, 0.5, (n_symbols, n_bars))),
+    }
+
+
+def gbm_frames(n_bars, n_symbols=1, seed=0):
+    # one DataFrame per symbol; minute stamps so a million bars still fit pandas' calendar
+    data = gbm_ohlcv(n_bars, n_symbols, seed)
+    index = pd.date_range('2000-01-03', periods=n_bars, freq='min', name='Date')
+    return [pd.DataFrame({c: v[k] for c, v in data.items()}, index=index) for k in range(n_symbols)]
+
+
+# cases
+
+CASES = {}
+
+
+def case(name, axes=('bars',), max_bars=None, requires=()):
+    # register func(frames) as a benchmark; axes says which sizes it is run over
+    def register(func):
+        CASES[name] = {'func': func, 'axes': axes, 'max_bars': max_bars, 'requires': requires}
+        return func
+    return register
+
+
+@case('utils.multiple_emas', max_bars=100_000)
+def _utils_multiple_emas(frames):
+    import utils
+    for df in frames:
+        utils.multiple_emas(df.copy(), BUDGET)
+
+
+@case('utils.macd', max_bars=100_000)
+def _utils_macd(frames):
+    import utils
+    for df in frames:
+        utils.macd(df.copy(), BUDGET)
+
+
+@case('core.multiple_emas_fast', axes=('bars', 'symbols'))
+def _core_multiple_emas(frames):
+    import core
+    for df in frames:
+        core.crossover_arrays(df['Close'].to_numpy(), BUDGET)
+
+
+@case('core.macd_fast', axes=('bars', 'symbols'))
+def _core_macd(frames):
+    import core
+    for df in frames:
+        core.macd_arrays(df['Close'].to_numpy(), BUDGET)
+
+
+@case('test2.golden_cross_strategy', axes=('bars', 'symbols'), requires=('test2',))
+def _golden_cross(frames):
+    # a fresh engine per call: test2's shared one would answer every repeat after the first from its cache
+    import test2
+    from indicators import IndicatorEngine
+    for df in frames:
+        df = df.reset_index()  # the weekly CSV frames have a RangeIndex
+        test2.golden_cross_strategy(df, indicators=IndicatorEngine().bind(None, df))
+
+
+@case('test2.rsi_strategy', axes=('bars', 'symbols'), requires=('test2', 'talib'))
+def _rsi(frames):
+    import test2
+    from indicators import IndicatorEngine
+    for df in frames:
+        test2.rsi_strategy(df, indicators=IndicatorEngine().bind(None, df))
+
+
+@case('test2.macd_strategy', axes=('bars', 'symbols'), requires=('test2', 'talib'))
+def _macd_strategy(frames):
+    import test2
+    from indicators import IndicatorEngine
+    for df in frames:
+        test2.macd_strategy(df, indicators=IndicatorEngine().bind(None, df))
+
+
+@case('screening.conditions', axes=('symbols',))
+def _screening_conditions(frames):
+    # test2's shared per-ticker conditions as screening.screen evaluates them, index return included
+    import screening
+    from indicators import IndicatorEngine
+    engine = IndicatorEngine()
+    index_return = screening.total_return(frames[0])
+    for k, stock_df in enumerate(frames):
+        screening.conditions(stock_df, index_return, engine.bind(k, stock_df))
+
+
+@case('universe_screen.screen', axes=('symbols',))
+def _universe_screen(frames):
+    # the same conditions over the (date x ticker) panel, the first frame standing in for ^NSEI
+    import universe_screen
+    panels = {f: pd.DataFrame({k: df[f] for k, df in enumerate(frames)}) for f in universe_screen.FIELDS}
+    universe_screen.screen(panels['Adj Close'], panels['High'], panels['Low'], frames[0]['Adj Close'])
+
+
+@case('testin.lstm_windows', axes=('bars', 'symbols'))
+def _lstm_windows(frames):
+    # the Stock Prediction page's scaling and window build up to the predict input
+    import lstm_dataset
+    for df in frames:
+        closes = df['Close'].to_numpy()
+        lo, span = closes.min(), closes.max() - closes.min()
+        scaled = lstm_dataset.close_buffer((closes - lo) / span)
+        x, _ = lstm_dataset.windows(scaled, 60)
+        np.ascontiguousarray(x[..., None])
+
+
+@case('testin.lstm_dataset', max_bars=100_000, requires=('tensorflow',))
+def _lstm_dataset(frames):
+    import lstm_dataset
+    for df in frames:
+        for _ in lstm_dataset.make_dataset(df['Close'].to_numpy(), 60, batch_size=256):
+            pass
+
+
+# measuring
+
+def _missing(requires):
+    for module in requires:
+        try:
+            __import__(module)
+        except Exception as e:
+            return f'{module}: {type(e).__name__}: {e}'
+    return None
+
+
+def measure(func, frames, min_seconds=0.2, max_repeats=5):
+    # best wall time of a few repeats, then the peak traced memory of one more run
+    best, spent, repeats = float('inf'), 0.0, 0
+    while repeats < max_repeats and (repeats == 0 or spent < min_seconds):
+        started = time.perf_counter()
+        func(frames)
+        seconds = time.perf_counter() - started
+        best, spent, repeats = min(best, seconds), spent + seconds, repeats + 1
+    tracemalloc.start()
+    try:
+        func(frames)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, repeats, peak
+
+
+def sizes(spec, preset):
+    # (bars, symbols) pairs a case runs at under a preset
+    out = []
+    if 'bars' in spec['axes']:
+        out += [(b, 1) for b in preset['bars'] if spec['max_bars'] is None or b <= spec['max_bars']]
+    if 'symbols' in spec['axes']:
+        out += [(SCREEN_BARS, s) for s in preset['symbols'] if (SCREEN_BARS, s) not in out]
+    return out
+
+
+def run(names=None, preset='quick', verbose=True):
+    preset_sizes = PRESETS[preset]
+    results = []
+    for name in names or CASES:
+        spec = CASES[name]
+        missing = _missing(spec['requires'])
+        if missing:
+            results.append({'case': name, 'skipped': missing})
+            if verbose:
+                print(f"{name:32} skipped ({missing})")
+            continue
+        spec['func'](gbm_frames(100))  # warm up imports and numba compilation
+        for bars, symbols in sizes(spec, preset_sizes):
+            frames = gbm_frames(bars, symbols, seed=bars + symbols)
+            seconds, repeats, peak = measure(spec['func'], frames)
+            row = {
+                'case': name, 'bars': bars, 'symbols': symbols, 'seconds': seconds, 'repeats': repeats,
+                'bars_per_second': bars * symbols / seconds if seconds else None,
+                'peak_mb': peak / 2 ** 20,
+            }
+            results.append(row)
+            if verbose:
+                print(f"{name:32} {bars:>9,} bars x {symbols:>4} symbols  {seconds:9.4f}s  "
+                      f"{row['bars_per_second']:>14,.0f} bars/s  {row['peak_mb']:8.1f} MB")
+    return results
+
+
+def scaling(results):
+    # log-log slope of seconds against total bars per case: ~1 is linear, >1 worse
+    slopes = {}
+    for name in {r['case'] for r in results if 'seconds' in r}:
+        for axis in ('bars', 'symbols'):
+            rows = [r for r in results if r['case'] == name and 'seconds' in r
+                    and (r['symbols'] == 1 if axis == 'bars' else r['bars'] == SCREEN_BARS)]
+            if len({r[axis] for r in rows}) >= 2:
+                x = np.log([r['bars'] * r['symbols'] for r in rows])
+                y = np.log([max(r['seconds'], 1e-9) for r in rows])
+                slopes[f'{name} ({axis})'] = float(np.polyfit(x, y, 1)[0])
+    return slopes
+
+
+def compare(results, baseline, tolerance=0.2):
+    # rows of (case, bars, symbols, baseline s, now s, ratio, verdict) for sizes present in both
+    before = {(r['case'], r['bars'], r['symbols']): r['seconds'] for r in baseline if 'seconds' in r}
+    rows = []
+    for r in results:
+        key = (r.get('case'), r.get('bars'), r.get('symbols'))
+        if 'seconds' not in r or key not in before:
+            continue
+        ratio = r['seconds'] / before[key] if before[key] else float('inf')
+        verdict = 'slower' if ratio > 1 + tolerance else 'faster' if ratio < 1 / (1 + tolerance) else 'same'
+        rows.append((*key, before[key], r['seconds'], ratio, verdict))
+    return rows
+
+
+# history
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _read_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the backtest, screening and forecasting hot paths')
+    parser.add_argument('--preset', choices=list(PRESETS), default='quick')
+    parser.add_argument('--only', nargs='+', choices=list(CASES), default=None)
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='relative change counted as noise')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    results = run(args.only, args.preset)
+    entry = {
+        'timestamp': dt.datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'preset': args.preset,
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'cpus': os.cpu_count(), 'numpy': np.__version__, 'pandas': pd.__version__},
+        'results': results,
+        'scaling': scaling(results),
+    }
+    history = _read_json(HISTORY_PATH, [])
+    history.append(entry)
+    _write_json(HISTORY_PATH, history)
+
+    print('\nScaling exponent (seconds ~ bars^k):')
+    for name, slope in sorted(entry['scaling'].items()):
+        print(f"  {name:44} {slope:5.2f}")
+
+    regressions = []
+    baseline = _read_json(BASELINE_PATH, None)
+    if baseline is not None:
+        print(f"\nAgainst the baseline from {baseline['timestamp']} ({baseline.get('commit')}):")
+        for name, bars, symbols, before, now, ratio, verdict in compare(results, baseline['results'], args.tolerance):
+            print(f"  {name:32} {bars:>9,} x {symbols:>4}  {before:9.4f}s -> {now:9.4f}s  x{ratio:5.2f}  {verdict}")
+            if verdict == 'slower':
+                regressions.append(name)
+    if args.save_baseline or baseline is None:
+        _write_json(BASELINE_PATH, entry)
+        print(f"\nSaved the baseline to {BASELINE_PATH}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
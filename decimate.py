@@ -0,0 +1,115 @@
+# DECIMATE
+# Shrinks series to about one point per horizontal pixel before they are sent to
+# the browser. Lines go through LTTB (largest-triangle-three-buckets), which keeps
+# the visual shape including spikes; minmax keeps each bucket's extremes and is a
+# cheaper choice for static images. Frames with more than LTTB_MAX_SERIES series
+# use minmax over all columns in one vectorized pass: the union of per-series
+# LTTB picks would exceed the point budget and be thinned anyway. Candlesticks are merged into wider bars that
+# keep the first open, highest high, lowest low, last close and summed volume.
+import numpy as np
+import pandas as pd
+
+LTTB_MAX_SERIES = 2  # up to this many series, the union of LTTB picks stays within 2 * width
+
+
+def _as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    if x.dtype == object:  # e.g. datetime.date values after reset_index
+        return pd.to_datetime(x).values.astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def lttb(x, y, n_out):
+    # indices of the n_out points LTTB keeps, first and last always included
+    x = _as_float(x)
+    y = np.asarray(y, dtype=np.float64).ravel()
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # NaNs would poison the triangle areas, treat them as the previous value
+    if np.isnan(y).any():
+        y = pd.Series(y).ffill().bfill().fillna(0).to_numpy()
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # average of the next bucket is the third corner of the triangle
+        nlo, nhi = hi, edges[b + 2] if b + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[b + 1] = a
+    return keep
+
+
+def minmax(y, n_out):
+    # indices of each bucket's lowest and highest point, for static plots: vectorized,
+    # and at one bucket per pixel column the drawn envelope is the same as the full line.
+    # A 2-D y (points x series) gives the union of every column's picks
+    y = np.asarray(y, dtype=np.float64)
+    y = y.reshape(len(y), -1)
+    n = len(y)
+    buckets = n_out // 2
+    if n <= n_out or buckets < 1:
+        return np.arange(n)
+    step = -(-n // buckets)
+    padded = np.concatenate([y, np.repeat(y[-1:], buckets * step - n, axis=0)]).reshape(buckets, step, -1)
+    # NaNs (a series not listed yet) never win a bucket
+    filled = np.where(np.isnan(padded), np.inf, padded)
+    lowest = filled.argmin(axis=1)
+    filled = np.where(np.isnan(padded), -np.inf, padded)
+    highest = filled.argmax(axis=1)
+    base = (np.arange(buckets) * step)[:, None]
+    keep = np.concatenate([[0, n - 1], (base + lowest).ravel(), (base + highest).ravel()])
+    return np.unique(np.minimum(keep, n - 1))
+
+
+def decimate_frame(df, width=1000):
+    # wide frame (index x series) for st.line_chart/area_chart/bar_chart
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+    if len(df) <= width:
+        return df
+    if df.shape[1] <= LTTB_MAX_SERIES:
+        x = df.index.values
+        keep = np.unique(np.concatenate([lttb(x, df[c].to_numpy(), width) for c in df.columns]))
+    else:
+        keep = minmax(df.to_numpy(dtype=np.float64), width)
+    if len(keep) > 2 * width:
+        # many series: the union of their picks is close to everything, thin it evenly
+        keep = keep[np.linspace(0, len(keep) - 1, 2 * width).astype(np.int64)]
+    return df.iloc[keep]
+
+
+def resample_ohlc(df, width=1000, date='Date'):
+    # merge consecutive candles so at most width remain, OHLC semantics preserved
+    n = len(df)
+    if n <= width:
+        return df
+    step = -(-n // width)
+    starts = np.arange(0, n, step)
+    ends = np.append(starts[1:], n) - 1
+
+    def col(name):
+        return np.asarray(df[name], dtype=np.float64).ravel()
+
+    out = {}
+    if date in df.columns:
+        out[date] = np.asarray(df[date])[starts]
+    out['Open'] = col('Open')[starts]
+    out['High'] = np.maximum.reduceat(col('High'), starts)
+    out['Low'] = np.minimum.reduceat(col('Low'), starts)
+    out['Close'] = col('Close')[ends]
+    for name in ('Adj Close',):
+        if name in df.columns:
+            out[name] = col(name)[ends]
+    if 'Volume' in df.columns:
+        out['Volume'] = np.add.reduceat(col('Volume'), starts)
+    index = df.index[starts] if date not in df.columns else None
+    return pd.DataFrame(out, index=index)
@@ -0,0 +1,330 @@
+# DOWNLOADER
+# Concurrent downloads for the screening scripts. Work runs on a thread pool,
+# each host has a token-bucket rate limit shared by all workers, and failures
+# are retried with exponential backoff. Plain page requests (get) go through a
+# pooled requests.Session per worker thread so keep-alive connections are reused
+# and retry on connection errors, 429 and 5xx, honouring Retry-After. Price
+# history still comes from yfinance (price_store.yahoo_fetch), which handles
+# Yahoo's cookie and crumb; the downloader only runs those calls concurrently
+# under the Yahoo host's rate limit, retrying when they raise.
+#
+#   downloader = Downloader(workers=16, rate=8)
+#   df = downloader.history('TCS.NS', start, end)              # daily bars indexed by Date
+#   failed = downloader.prefetch(price_store, tickers, start, end)  # fill a PriceStore concurrently
+#
+# fetch swaps the history source, e.g. for the local stand-in server:
+#   python downloader.py --serve --port 8765 --delay 0.2 --fail-rate 0.1
+#   python downloader.py TCS.NS INFY.NS ... --stand-in http://127.0.0.1:8765
+import argparse
+import datetime
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from urllib.parse import parse_qs, unquote, urlencode, urlparse
+from urllib.request import urlopen
+
+import pandas as pd
+
+from price_store import yahoo_fetch
+
+YAHOO_HOST = 'query1.finance.yahoo.com'
+RETRY_STATUS = {429, 500, 502, 503, 504}
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+
+def _timestamp(day):
+    # the period1/period2 epoch seconds of Yahoo's download URL
+    if isinstance(day, datetime.datetime):
+        day = day.date()
+    return int(time.mktime(day.timetuple()))
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After', 0))
+    except ValueError:
+        return 0.0
+
+
+class RateLimiter:
+    # token bucket: `rate` requests per second on average, bursts of up to `burst`
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Downloader:
+    def __init__(self, workers=16, rate=10.0, burst=None, retries=3, backoff=0.5, timeout=15,
+                 fetch=yahoo_fetch, host=YAHOO_HOST, headers=HEADERS):
+        self.workers = workers
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.fetch = fetch
+        self.host = host
+        self.headers = dict(headers)
+        self.requests = self.retried = 0
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='download')
+        self._local = threading.local()
+        self._sessions = []
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def session(self):
+        # a Session is not safe to share between threads, so each thread pools its own connections
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(self.headers)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def _limiter(self, host):
+        with self._lock:
+            if host not in self._limits:
+                self._limits[host] = RateLimiter(self.rate, self.burst)
+            return self._limits[host]
+
+    def get(self, url, params=None):
+        # GET under the host's rate limit, retrying transient failures; raises for a final non-2xx
+        import requests
+        limiter = self._limiter(urlparse(url).netloc)
+        for attempt in range(self.retries + 1):
+            limiter.acquire()
+            with self._lock:
+                self.requests += 1
+            delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            try:
+                response = self.session().get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS or attempt == self.retries:
+                    response.raise_for_status()
+                    return response
+                delay = max(delay, _retry_after(response))
+            with self._lock:
+                self.retried += 1
+            time.sleep(delay)
+
+    def call(self, host, func, *args):
+        # func(*args) under host's rate limit, retried with backoff while it raises
+        limiter = self._limiter(host)
+        for attempt in range(self.retries + 1):
+            limiter.acquire()
+            with self._lock:
+                self.requests += 1
+            try:
+                return func(*args)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+            with self._lock:
+                self.retried += 1
+            time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    # price history
+    def history(self, ticker, start, end, interval='1d'):
+        # bars indexed by Date from self.fetch; also a PriceStore fetch
+        return self.call(self.host, self.fetch, ticker, start, end, interval)
+
+    # many at once
+    def map(self, func, items):
+        # run func(item) for every item on the pool: ({item: result}, {item: exception})
+        items = list(dict.fromkeys(items))
+        futures = {item: self.pool.submit(func, item) for item in items}
+        results, failed = {}, {}
+        for item, future in futures.items():
+            try:
+                results[item] = future.result()
+            except Exception as e:
+                failed[item] = e
+        return results, failed
+
+    def download(self, tickers, start, end, interval='1d'):
+        return self.map(lambda ticker: self.history(ticker, start, end, interval), tickers)
+
+    def prefetch(self, store, tickers, start, end):
+        # fill the store's missing ranges for every ticker concurrently; {ticker: exception} for failures
+        _, failed = self.map(lambda ticker: store.fill(ticker, start, end), tickers)
+        return failed
+
+    def close(self):
+        self.pool.shutdown()
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def stand_in_fetch(base_url):
+    # a history fetch reading the stand-in server's CSV endpoint; Yahoo's own one wants a cookie and crumb
+    def fetch(ticker, start, end, interval='1d'):
+        params = urlencode({'period1': _timestamp(start), 'period2': _timestamp(end), 'interval': interval})
+        with urlopen(f'{base_url}/v7/finance/download/{ticker}?{params}', timeout=15) as response:
+            df = pd.read_csv(StringIO(response.read().decode()))
+        df.index = pd.DatetimeIndex(pd.to_datetime(df.pop('Date')), name='Date')
+        return df
+    return fetch
+
+
+class FakeYahooServer:
+    # local stand-in for Yahoo: the download endpoint with deterministic random-walk bars
+    # (market_data.FakeProvider's) and /quote/<ticker> pages with a quote-summary table,
+    # plus optional latency and a fraction of 503s to exercise retries
+    def __init__(self, port=0, delay=0.0, fail_rate=0.0, seed=0):
+        from market_data import FakeProvider
+        self.provider = FakeProvider(seed=seed)
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.hits = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_port}'
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, so pooled connections are really reused
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.hits += 1
+                if fake.delay:
+                    time.sleep(fake.delay)
+                url = urlparse(self.path)
+                if not url.path.startswith(('/v7/finance/download/', '/quote/')):
+                    return self._reply(404, 'not found')
+                if random.random() < fake.fail_rate:
+                    return self._reply(503, 'try again')
+                ticker = unquote(url.path.rstrip('/').rsplit('/', 1)[1])
+                if url.path.startswith('/quote/'):
+                    return self._reply(200, fake.quote_page(ticker), 'text/html')
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                self._reply(200, fake.bars(ticker, int(query['period1']), int(query['period2']),
+                                           query.get('interval', '1d')))
+
+            def _reply(self, status, body, content_type='text/csv'):
+                data = body.encode()
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def bars(self, ticker, period1, period2, interval):
+        start = datetime.date.fromtimestamp(period1)
+        end = datetime.date.fromtimestamp(period2)
+        df = self.provider.download([ticker], start, end).xs(ticker, axis=1, level=1)
+        if interval != '1d':
+            rule = {'1wk': 'W-MON', '1mo': 'MS'}[interval]
+            df = df.resample(rule, label='left', closed='left').agg(
+                {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last',
+                 'Adj Close': 'last', 'Volume': 'sum'}).dropna()
+        return df.to_csv(index_label='Date', date_format='%Y-%m-%d')
+
+    def quote_page(self, ticker):
+        # a quote page about the size of Yahoo's, the summary table after most of it
+        pe = 10 + sum(map(ord, ticker)) % 30 + 0.25
+        rows = {'Previous Close': '1,234.50', 'Market Cap': '1.2T', 'Beta (5Y Monthly)': '0.85',
+                'PE Ratio (TTM)': f'{pe:,.2f}', 'EPS (TTM)': '54.10'}
+        table = ''.join(f'<tr><td><span>{k}</span></td><td><span>{v}</span></td></tr>' for k, v in rows.items())
+        filler = '<script>var state = {"quote": "%s"};</script>' % ('x' * 200) * 1500
+        return (f'<html><head><title>{ticker}</title>{filler}</head><body><div id="header"><p>{ticker}</p></div>'
+                f'<div id="quote-summary"><div><table><tbody>{table}</tbody></table></div></div>'
+                f'<div id="news">{filler[:50000]}</div></body></html>')
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Download daily bars concurrently, or serve fake ones')
+    parser.add_argument('tickers', nargs='*')
+    parser.add_argument('--serve', action='store_true', help='run the local stand-in Yahoo server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.0, help='stand-in server latency per request')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='fraction of stand-in requests answered 503')
+    parser.add_argument('--stand-in', default=None, help='read bars from a stand-in server at this URL')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=10.0, help='requests per second per host')
+    parser.add_argument('--days', type=int, default=1825)
+    args = parser.parse_args()
+
+    if args.serve:
+        server = FakeYahooServer(args.port, args.delay, args.fail_rate)
+        print(f"Serving fake Yahoo bars on {server.url}")
+        server.server.serve_forever()
+        return
+
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=args.days)
+    fetch = stand_in_fetch(args.stand_in) if args.stand_in else yahoo_fetch
+    with Downloader(args.workers, args.rate, fetch=fetch) as downloader:
+        started = time.perf_counter()
+        results, failed = downloader.download(args.tickers, start, end)
+        elapsed = time.perf_counter() - started
+        for ticker, e in failed.items():
+            print(f"Error downloading data for {ticker}: {e}")
+        print(f"{len(results)} tickers, {sum(map(len, results.values())):,} bars in {elapsed:.2f}s "
+              f"({downloader.requests} requests, {downloader.retried} retried)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,38 @@
 # BACKTEST
 import pandas as pd
-from nsepy import get_history as gh
 from datetime import datetime
-from utils import *
+from data import open_store, stock_list
+from results import backtest
 
-stock_list = ['BHARTIARTL', 'ICICIBANK', 'TATASTEEL',
-              'IDEA', 'CANBK', 'JINDALSTEL',
-               'LUXIND', 'IDFC', 'CEATLTD',
-              'ICICINIFTY'
-]
+# bars already on disk are read back as mmap views, only new dates are downloaded
+store = open_store()
 
 symbol = stock_list[0]
 start = datetime(2010, 1, 1)
 end = datetime(2024, 2, 1)
-df = gh(symbol=symbol, start=start, end=end)
+df = store.read(symbol, start, end)
 budget = 100000
 
 # CROSSOVER
-crossover_df = multiple_emas(df, budget)
-crossover_df.to_csv(f'crossover_{symbol}.csv', index=True)
+# equity curve and trades only; result.frame(df) rebuilds every utils column if needed
+crossover_result = backtest(df['Close'], budget, 'crossover', symbol=symbol)
+crossover_result.save(f'crossover_{symbol}.npz')
 
 
 # MACD
-macd_df = macd(df, budget)
-macd_df.to_csv(f'macd_{symbol}.csv',index=True)
+macd_result = backtest(df['Close'], budget, 'macd', symbol=symbol)
+macd_result.save(f'macd_{symbol}.npz')
 
 all_tests = []
 for stock in stock_list:
     start = datetime(2016, 1, 1)
     end = datetime(2019, 1, 1)
-    df = gh(symbol=stock, start=start, end=end)
+    df = store.read(stock, start, end)
 
     # MACD
-    macd_df = macd(df[['Close']], budget)
+    macd_total = backtest(df['Close'], budget, 'macd').final
     # CROSSOVER
-    crossover_df = multiple_emas(df[['Close']], budget)
-
-
-    crossover_total = crossover_df['Total'][-1]
-    macd_total = macd_df['Total'][-1]
+    crossover_total = backtest(df['Close'], budget, 'crossover').final
 
     all_tests.append(
         {'Symbol': stock, 'Crossover': crossover_total, 'MACD': macd_total}
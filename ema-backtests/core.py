@@ -0,0 +1,274 @@
+# BACKTEST CORE
+# The crossover and MACD strategies of utils.py run over plain NumPy arrays in a
+# single pass. The EWMs and buy/sell state machines are sequential, so they are
+# small loops that Numba compiles when it is installed (plain Python over lists
+# otherwise); the share/asset/profit bookkeeping is vectorized. Results are
+# bit-identical to utils.multiple_emas / utils.macd, including their quirks
+# (nothing bought on the first bar is counted in Current_Assets or Total).
+# crossover_paths / macd_paths run the same machines over every row of a 2-D
+# (path x time) array in one compiled pass and keep only summary statistics.
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+
+def _jit(func):
+    return njit(cache=True)(func) if HAVE_NUMBA else func
+
+
+def _seq(a):
+    # numba wants arrays, the python fallback is faster on lists
+    return np.ascontiguousarray(a, dtype=np.float64) if HAVE_NUMBA else np.asarray(a, dtype=np.float64).tolist()
+
+
+@_jit
+def _ewm_kernel(x, alpha, out):
+    # pandas' ewm(adjust=False).mean() recurrence, operation for operation
+    n = len(x)
+    if n == 0:
+        return out
+    old_wt_factor = 1.0 - alpha
+    weighted = x[0]
+    nobs = 1 if weighted == weighted else 0
+    out[0] = weighted if nobs > 0 else np.nan
+    old_wt = 1.0
+    for i in range(1, n):
+        cur = x[i]
+        is_obs = cur == cur
+        if is_obs:
+            nobs += 1
+        if weighted == weighted:
+            old_wt *= old_wt_factor
+            if is_obs:
+                if weighted != cur:
+                    weighted = old_wt * weighted + alpha * cur
+                    weighted /= old_wt + alpha
+                old_wt = 1.0
+        elif is_obs:
+            weighted = cur
+        out[i] = weighted if nobs > 0 else np.nan
+    return out
+
+
+@_jit
+def _crossover_kernel(close, short, middle, long, buy, sell):
+    flag_long = False
+    flag_short = False
+    prev_buy_value = np.nan
+    for i in range(len(close)):
+        c = close[i]
+        if middle[i] < long[i] and short[i] < middle[i] and not flag_long and not flag_short:
+            buy[i] = c
+            flag_short = True
+            prev_buy_value = c
+        elif flag_short and short[i] > middle[i] and prev_buy_value < c:
+            sell[i] = c
+            flag_short = False
+        elif middle[i] > long[i] and short[i] > middle[i] and not flag_long and not flag_short:
+            buy[i] = c
+            flag_long = True
+            prev_buy_value = c
+        elif flag_long and short[i] < middle[i] and prev_buy_value < c:
+            sell[i] = c
+            flag_long = False
+    return buy, sell
+
+
+@_jit
+def _macd_kernel(close, macd, signal, buy, sell):
+    bought = False
+    prev_buy_value = np.nan
+    for i in range(len(close)):
+        c = close[i]
+        if macd[i] > signal[i] and not bought:
+            buy[i] = c
+            bought = True
+            prev_buy_value = c
+        elif macd[i] < signal[i] and bought and c > prev_buy_value:
+            sell[i] = c
+            bought = False
+    return buy, sell
+
+
+@_jit
+def _book_stats(close, buy, sell, budget, out):
+    # final Total, max drawdown of budget + Total and number of buys, without per-bar columns;
+    # the same bookkeeping as _book, first-bar quirk included
+    assets = 0
+    cash = 0.0
+    last_shares = -1
+    peak = budget
+    drawdown = 0.0
+    trades = 0
+    total = 0.0
+    for i in range(len(close)):
+        shares = 0
+        profit = 0.0
+        if buy[i] == buy[i]:
+            shares = int(np.floor(budget / buy[i]))
+            last_shares = shares
+            profit = -buy[i] * shares
+            trades += 1
+        elif sell[i] == sell[i] and last_shares >= 0:
+            shares = -last_shares
+            profit = sell[i] * last_shares
+        if i > 0:
+            assets += shares
+            cash += profit
+        total = cash + assets * close[i]
+        equity = budget + total
+        if equity > peak:
+            peak = equity
+        if equity / peak - 1 < drawdown:
+            drawdown = equity / peak - 1
+    out[0] = total
+    out[1] = drawdown
+    out[2] = trades
+    return out
+
+
+@_jit
+def _crossover_paths(paths, alphas, budget, stats):
+    n = paths.shape[1]
+    for p in range(paths.shape[0]):
+        close = paths[p]
+        short = _ewm_kernel(close, alphas[0], np.empty(n))
+        middle = _ewm_kernel(close, alphas[1], np.empty(n))
+        long = _ewm_kernel(close, alphas[2], np.empty(n))
+        buy, sell = _crossover_kernel(close, short, middle, long, np.full(n, np.nan), np.full(n, np.nan))
+        _book_stats(close, buy, sell, budget, stats[p])
+    return stats
+
+
+@_jit
+def _macd_paths(paths, alphas, budget, stats):
+    n = paths.shape[1]
+    for p in range(paths.shape[0]):
+        close = paths[p]
+        macd = _ewm_kernel(close, alphas[0], np.empty(n)) - _ewm_kernel(close, alphas[1], np.empty(n))
+        signal = _ewm_kernel(macd, alphas[2], np.empty(n))
+        buy, sell = _macd_kernel(close, macd, signal, np.full(n, np.nan), np.full(n, np.nan))
+        _book_stats(close, buy, sell, budget, stats[p])
+    return stats
+
+
+def _alpha(span):
+    return 1.0 / (1.0 + (span - 1) / 2)  # pandas' span -> center of mass -> alpha
+
+
+def ewm_mean(x, span):
+    out = np.empty(len(x))
+    return _ewm_kernel(_seq(x), _alpha(span), out)
+
+
+def _signals(kernel, close, *lines):
+    n = len(close)
+    buy = np.full(n, np.nan)
+    sell = np.full(n, np.nan)
+    return kernel(_seq(close), *(_seq(line) for line in lines), buy, sell)
+
+
+def _book(close, buy, sell, budget):
+    # Stocks_To_Buy .. Total of utils.py, vectorized
+    n = len(close)
+    bought = ~np.isnan(buy)
+    sold = ~np.isnan(sell)
+    stocks_to_buy = np.zeros(n, dtype=np.int64)
+    stocks_to_buy[bought] = np.floor(budget / buy[bought])
+    # every sell closes the shares of the most recent buy
+    last_buy = np.maximum.accumulate(np.where(bought, np.arange(n), -1)) if n else np.zeros(0, np.int64)
+    stocks_to_sell = np.where(sold & (last_buy >= 0), stocks_to_buy[np.maximum(last_buy, 0)], 0)
+    current_assets = np.zeros(n, dtype=np.int64)
+    current_assets[1:] = np.cumsum((stocks_to_buy - stocks_to_sell)[1:])
+    value = current_assets * close
+    profits = np.where(bought, -buy * stocks_to_buy, np.where(sold, sell * stocks_to_sell, 0.0))
+    totals = np.zeros(n)
+    totals[1:] = np.cumsum(profits[1:])
+    return {
+        'Stocks_To_Buy': stocks_to_buy,
+        'Stocks_To_Sell': stocks_to_sell,
+        'Current_Assets': current_assets,
+        'Value': value,
+        'Profits': profits,
+        'Total': totals + value,
+    }
+
+
+def crossover_from_lines(close, short, middle, long, budget):
+    # signals and book for EMA lines that were already computed (e.g. shared in a sweep)
+    out = {}
+    out['Buy'], out['Sell'] = _signals(_crossover_kernel, close, short, middle, long)
+    out.update(_book(close, out['Buy'], out['Sell'], budget))
+    return out
+
+
+def macd_from_lines(close, macd_line, signal_line, budget):
+    out = {}
+    out['Buy'], out['Sell'] = _signals(_macd_kernel, close, macd_line, signal_line)
+    out.update(_book(close, out['Buy'], out['Sell'], budget))
+    return out
+
+
+def crossover_signals(close, short=5, middle=20, long=60):
+    # (buy, sell) price arrays, NaN where there is no signal
+    return _signals(_crossover_kernel, close, ewm_mean(close, short), ewm_mean(close, middle), ewm_mean(close, long))
+
+
+def macd_signals(close, fast=12, slow=26, signal=9):
+    macd_line = ewm_mean(close, fast) - ewm_mean(close, slow)
+    return _signals(_macd_kernel, close, macd_line, ewm_mean(macd_line, signal))
+
+
+def crossover_arrays(close, budget, short=5, middle=20, long=60):
+    close = np.asarray(close, dtype=np.float64)
+    out = {
+        'Short': ewm_mean(close, short),
+        'Middle': ewm_mean(close, middle),
+        'Long': ewm_mean(close, long),
+    }
+    out.update(crossover_from_lines(close, out['Short'], out['Middle'], out['Long'], budget))
+    return out
+
+
+def macd_arrays(close, budget, fast=12, slow=26, signal=9):
+    close = np.asarray(close, dtype=np.float64)
+    macd_line = ewm_mean(close, fast) - ewm_mean(close, slow)
+    out = {'MACD': macd_line, 'Signal': ewm_mean(macd_line, signal)}
+    out['Hist'] = out['MACD'] - out['Signal']
+    out.update(macd_from_lines(close, out['MACD'], out['Signal'], budget))
+    return out
+
+
+def _paths(kernel, paths, budget, spans):
+    # (n_paths, 3) array of final Total, max drawdown and buys for every row of paths
+    paths = np.ascontiguousarray(paths, dtype=np.float64)
+    stats = np.zeros((len(paths), 3))
+    return kernel(paths, np.array([_alpha(s) for s in spans]), float(budget), stats)
+
+
+def crossover_paths(paths, budget, short=5, middle=20, long=60):
+    return _paths(_crossover_paths, paths, budget, (short, middle, long))
+
+
+def macd_paths(paths, budget, fast=12, slow=26, signal=9):
+    return _paths(_macd_paths, paths, budget, (fast, slow, signal))
+
+
+def _attach(df, columns):
+    for name, values in columns.items():
+        df[name] = values
+    return df
+
+
+def multiple_emas_fast(df, budget):
+    # drop-in for utils.multiple_emas: adds the same columns to df and returns it
+    return _attach(df, crossover_arrays(df['Close'].to_numpy(), budget))
+
+
+def macd_fast(df, budget):
+    # drop-in for utils.macd
+    return _attach(df, macd_arrays(df['Close'].to_numpy(), budget))
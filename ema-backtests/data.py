@@ -0,0 +1,44 @@
+# DATA
+# Where the ema-backtests scripts get their prices: nsepy history through the
+# shared on-disk price store, so each symbol is only downloaded once.
+import os
+import sys
+from datetime import timedelta
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from price_store import PriceStore
+
+STORE_ROOT = 'price_store'
+
+stock_list = ['BHARTIARTL', 'ICICIBANK', 'TATASTEEL',
+              'IDEA', 'CANBK', 'JINDALSTEL',
+               'LUXIND', 'IDFC', 'CEATLTD',
+              'ICICINIFTY'
+]
+
+
+def nse_fetch(symbol, start, end):
+    from nsepy import get_history as gh
+    # nsepy's end date is inclusive, the store asks for [start, end)
+    return gh(symbol=symbol, start=start.date(), end=(end - timedelta(days=1)).date())
+
+
+def open_store(root=STORE_ROOT):
+    return PriceStore(root, fetch=nse_fetch)
+
+
+def load_closes(symbols, start, end, store=None):
+    # {symbol: float64 close array}, symbols that fail to load are skipped
+    store = store or open_store()
+    closes = {}
+    for symbol in symbols:
+        try:
+            df = store.read(symbol, start, end)
+        except Exception as e:
+            print(f"Error loading data for {symbol}: {e}")
+            continue
+        if len(df) and 'Close' in df.columns:
+            closes[symbol] = np.asarray(df['Close'], dtype=np.float64)
+    return closes
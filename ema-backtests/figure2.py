@@ -1,21 +1,23 @@
 # GRAPH OF BHARTIARTL PROFITS
 import pandas as pd
 from matplotlib import pyplot as plt
+from data import open_store
+from results import BacktestResult
 
 # Crossover profit curve
-crossover_profits = pd.read_csv('crossover_BHARTIARTL.csv')[['Date', 'Total']]
-crossover_profits['Date'] = pd.to_datetime(crossover_profits['Date'])
-crossover_profits.index = crossover_profits['Date']
+crossover_profits = BacktestResult.load('crossover_BHARTIARTL.npz').equity()
 
 # MACD profit curve
-macd_profits = pd.read_csv('macd_BHARTIARTL.csv')
+macd_profits = BacktestResult.load('macd_BHARTIARTL.npz').equity()
 
 # Holding profit curve
-hold_profits = (macd_profits['Close'] * 307) - 100000
+dates = macd_profits.index
+close = open_store().read('BHARTIARTL', dates[0], dates[-1] + pd.Timedelta(days=1))['Close']
+hold_profits = (close * 307) - 100000
 
 x = crossover_profits.index
-y1 = crossover_profits['Total']
-y2 = macd_profits['Total']
+y1 = crossover_profits
+y2 = macd_profits
 y3 = hold_profits
 
 # plotting the points
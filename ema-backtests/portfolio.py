@@ -0,0 +1,193 @@
+# PORTFOLIO
+# Many symbols traded from one cash account on one calendar. Each symbol's
+# crossover or MACD signals are computed as before; the portfolio then walks the
+# aligned (date x symbol) price array once, selling on sell signals, opening new
+# positions on buy signals while cash and position slots last, and optionally
+# rebalancing open positions back to an equal weight every `rebalance` bars.
+#
+#   python portfolio.py [--universe ../symbols.csv] [--strategy crossover]
+#                       [--budget 10000000] [--max-positions 20] [--rebalance 21] [--cost 0.001]
+#
+# Sizing: a new position gets equity / max_positions (less if cash is short),
+# in whole shares at the signal bar's close, with `cost` as a fraction of every
+# traded value. When more symbols signal than there are free slots, columns
+# earlier in the panel win. The walk is a compiled loop (Numba when installed), so 500
+# symbols over 15 years take a few milliseconds once the signals exist.
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from core import _jit, crossover_signals, macd_signals
+
+SIGNALS = {'crossover': crossover_signals, 'macd': macd_signals}
+
+
+@_jit
+def _portfolio_kernel(prices, buy, sell, budget, max_positions, rebalance, cost, equity, cash_curve, fills):
+    n_bars, n_symbols = prices.shape
+    cash = budget
+    shares = np.zeros(n_symbols, np.int64)
+    held = 0
+    for t in range(n_bars):
+        # exits first, so their cash can fund today's entries
+        for j in range(n_symbols):
+            if sell[t, j] and shares[j] > 0:
+                cash += shares[j] * prices[t, j] * (1 - cost)
+                fills[t, j] -= shares[j]
+                shares[j] = 0
+                held -= 1
+        value = 0.0
+        for j in range(n_symbols):
+            value += shares[j] * prices[t, j]
+        target = (cash + value) / max_positions
+
+        for j in range(n_symbols):
+            if held >= max_positions:
+                break
+            if buy[t, j] and shares[j] == 0 and prices[t, j] > 0:
+                n = int(min(target, cash) / (prices[t, j] * (1 + cost)))
+                if n > 0:
+                    shares[j] = n
+                    cash -= n * prices[t, j] * (1 + cost)
+                    fills[t, j] += n
+                    held += 1
+
+        if rebalance > 0 and t > 0 and t % rebalance == 0:
+            # trim overweight positions, then top up underweight ones with what cash allows
+            for j in range(n_symbols):
+                if shares[j] > 0:
+                    excess = shares[j] - int(target / prices[t, j])
+                    if excess > 0:
+                        cash += excess * prices[t, j] * (1 - cost)
+                        fills[t, j] -= excess
+                        shares[j] -= excess
+                        if shares[j] == 0:
+                            held -= 1
+            for j in range(n_symbols):
+                if shares[j] > 0:
+                    missing = int(target / prices[t, j]) - shares[j]
+                    n = min(missing, int(cash / (prices[t, j] * (1 + cost))))
+                    if n > 0:
+                        cash -= n * prices[t, j] * (1 + cost)
+                        fills[t, j] += n
+                        shares[j] += n
+
+        value = 0.0
+        for j in range(n_symbols):
+            value += shares[j] * prices[t, j]
+        equity[t] = cash + value
+        cash_curve[t] = cash
+    return equity
+
+
+class PortfolioResult:
+    def __init__(self, dates, symbols, prices, equity, cash, fills, budget):
+        self.dates = dates
+        self.symbols = symbols
+        self.prices = prices
+        self.equity = equity
+        self.cash = cash
+        self.fills = fills  # (date x symbol) shares bought (+) or sold (-) on each bar
+        self.budget = budget
+
+    def trades(self):
+        t, j = np.nonzero(self.fills)
+        return pd.DataFrame({
+            'Date': self.dates[t], 'Symbol': np.asarray(self.symbols)[j],
+            'Shares': self.fills[t, j], 'Price': self.prices[t, j],
+        })
+
+    def holdings(self):
+        # shares held at the end of each bar
+        return pd.DataFrame(np.cumsum(self.fills, axis=0), index=self.dates, columns=self.symbols)
+
+    def summary(self):
+        peak = np.maximum.accumulate(self.equity)
+        positions = np.count_nonzero(np.cumsum(self.fills, axis=0), axis=1)
+        return {
+            'final_equity': float(self.equity[-1]),
+            'return': float(self.equity[-1] / self.budget - 1),
+            'max_drawdown': float(np.min(self.equity / peak - 1)),
+            'trades': int(np.count_nonzero(self.fills)),
+            'avg_positions': float(positions.mean()),
+            'avg_cash_weight': float(np.mean(self.cash / self.equity)),
+        }
+
+
+def signal_matrices(closes, strategy='crossover', **params):
+    # (buy, sell) boolean (date x symbol) arrays; NaN closes (not listed yet, no bar that day) give no signals.
+    # Each symbol's signals run on its own bars only, as in its single-symbol backtest: a NaN inside
+    # the walk would poison the EWMs and the last buy price
+    closes = np.asarray(closes, dtype=np.float64)
+    buy = np.zeros(closes.shape, bool)
+    sell = np.zeros(closes.shape, bool)
+    for j in range(closes.shape[1]):
+        rows = np.flatnonzero(~np.isnan(closes[:, j]))
+        if len(rows) == 0:
+            continue
+        b, s = SIGNALS[strategy](closes[rows, j], **params)
+        buy[rows, j] = ~np.isnan(b)
+        sell[rows, j] = ~np.isnan(s)
+    return buy, sell
+
+
+def simulate(closes, buy, sell, budget=10_000_000, max_positions=20, rebalance=0, cost=0.0, dates=None, symbols=None):
+    closes = pd.DataFrame(closes)
+    # value positions at the last known close; 0 before a symbol lists
+    prices = np.ascontiguousarray(closes.ffill().fillna(0.0).to_numpy(dtype=np.float64))
+    n_bars, n_symbols = prices.shape
+    equity = np.empty(n_bars)
+    cash = np.empty(n_bars)
+    fills = np.zeros((n_bars, n_symbols), np.int64)
+    _portfolio_kernel(prices, np.ascontiguousarray(buy), np.ascontiguousarray(sell), float(budget),
+                      int(max_positions), int(rebalance), float(cost), equity, cash, fills)
+    dates = closes.index.values if dates is None else dates
+    symbols = list(closes.columns) if symbols is None else symbols
+    return PortfolioResult(dates, symbols, prices, equity, cash, fills, budget)
+
+
+def run(panel, budget=10_000_000, strategy='crossover', max_positions=20, rebalance=0, cost=0.0, **params):
+    # panel: (date x symbol) DataFrame of closes on one calendar, NaN where a symbol has no bar
+    buy, sell = signal_matrices(panel.to_numpy(), strategy, **params)
+    return simulate(panel, buy, sell, budget, max_positions, rebalance, cost)
+
+
+def load_panel(symbols, start, end, store=None):
+    from data import open_store
+    store = store or open_store()
+    closes = {}
+    for symbol in symbols:
+        try:
+            df = store.read(symbol, start, end)
+        except Exception as e:
+            print(f"Error loading data for {symbol}: {e}")
+            continue
+        if len(df) and 'Close' in df.columns:
+            closes[symbol] = df['Close']
+    return pd.DataFrame(closes).sort_index()  # union of every symbol's dates
+
+
+def main():
+    from data import stock_list
+    parser = argparse.ArgumentParser(description='Backtest a strategy over many symbols from one cash account')
+    parser.add_argument('--universe', default=None, help='csv with a Symbol column, e.g. ../symbols.csv')
+    parser.add_argument('--strategy', choices=list(SIGNALS), default='crossover')
+    parser.add_argument('--budget', type=float, default=10_000_000)
+    parser.add_argument('--max-positions', type=int, default=20)
+    parser.add_argument('--rebalance', type=int, default=0, help='bars between rebalances, 0 for never')
+    parser.add_argument('--cost', type=float, default=0.0, help='cost as a fraction of traded value')
+    args = parser.parse_args()
+
+    symbols = pd.read_csv(args.universe)['Symbol'].dropna().tolist() if args.universe else stock_list
+    panel = load_panel(symbols, datetime(2010, 1, 1), datetime(2024, 2, 1))
+    result = run(panel, args.budget, args.strategy, args.max_positions, args.rebalance, args.cost)
+    pd.Series(result.equity, index=panel.index, name='Equity').to_csv(f'portfolio_{args.strategy}.csv')
+    result.trades().to_csv(f'portfolio_{args.strategy}_trades.csv', index=False)
+    for key, value in result.summary().items():
+        print(f"{key:16} {value:,.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# REPORT
+# Static HTML/PNG report of backtest results, rendered without a display.
+#
+#   python report.py [results_dir] [--out report] [--workers N] [--width 1000]
+#
+# Reads the crossover_<symbol>.npz / macd_<symbol>.npz result files written by
+# backtest.py (or runner.py --npz) and draws, for every symbol, the figure1 /
+# figure2 charts: price with the crossover EMAs and trades, MACD against its
+# signal line, and the crossover, MACD and hold profit curves. Symbols are
+# rendered in a process pool straight onto Agg canvases (no pyplot, no GUI) and
+# every line is decimated to the min/max of about `width` buckets first, so long
+# histories cost the same as short ones.
+# Prices come from the local price store only, nothing is downloaded.
+import argparse
+import glob
+import html
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from data import open_store  # also puts the repo root on sys.path
+from decimate import minmax
+from results import BUY, LABELS, SELL, STRATEGIES, BacktestResult
+
+
+def find_results(root):
+    # {symbol: {strategy: path}}
+    found = {}
+    for path in glob.glob(os.path.join(root, '*.npz')):
+        match = re.fullmatch(r'(crossover|macd)_(.+)\.npz', os.path.basename(path))
+        if match:
+            found.setdefault(match.group(2), {})[match.group(1)] = path
+    return found
+
+
+def _line(ax, x, y, width, **kwargs):
+    keep = minmax(y, width)
+    ax.plot(x[keep], np.asarray(y)[keep], **kwargs)
+
+
+def _trades(ax, x, result, y=None):
+    # buy/sell markers at the trade price (or on y, e.g. the MACD line)
+    for side, marker, color in ((BUY, '^', 'g'), (SELL, 'v', 'r')):
+        bars = result.trades['bar'][result.trades['side'] == side]
+        values = result.trades['price'][result.trades['side'] == side] if y is None else y[bars]
+        ax.scatter(x[bars], values, marker=marker, color=color, s=25, zorder=3,
+                   label='Buy' if side == BUY else 'Sell')
+
+
+def _close(store, result):
+    # closes for the result's dates from the store, None if they are not held locally.
+    # The runner drops bars without a close, so the store may hold dates the result lacks
+    if store is None or result.dates.dtype.kind != 'M' or not len(result):
+        return None
+    end = result.dates[-1] + np.timedelta64(1, 'D')
+    dates, columns = store.read_arrays(result.symbol, result.dates[0], end)
+    if 'Close' not in columns:
+        return None
+    dates = np.asarray(dates).astype('datetime64[D]')
+    wanted = np.asarray(result.dates).astype('datetime64[D]')
+    rows = np.searchsorted(dates, wanted)
+    if not len(dates) or rows[-1] >= len(dates) or (dates[rows] != wanted).any():
+        return None
+    return np.asarray(columns['Close'])[rows]
+
+
+def render_symbol(symbol, paths, out, width=1000, store_root=None):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure  # no pyplot, so no GUI backend is ever touched
+    results = {name: BacktestResult.load(paths[name]) for name in STRATEGIES if name in paths}
+    first = next(iter(results.values()))
+    x = first.dates
+    store = open_store(store_root) if store_root else None
+    close = _close(store, first)
+
+    panels = (['crossover'] if close is not None and 'crossover' in results else []) + \
+             (['macd'] if close is not None and 'macd' in results else []) + ['equity']
+    fig = Figure(figsize=(11, 3.2 * len(panels)))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(len(panels), 1, sharex=True, squeeze=False)
+    for ax, panel in zip(axes[:, 0], panels):
+        if panel == 'crossover':
+            lines = results['crossover'].columns(close)
+            _line(ax, x, close, width, label='Close', color='0.3', linewidth=1)
+            for name in ('Short', 'Middle', 'Long'):
+                _line(ax, x, lines[name], width, label=name, linewidth=0.9)
+            _trades(ax, x, results['crossover'])
+            ax.set_ylabel('Price')
+            ax.set_title(f'{symbol} crossover')
+        elif panel == 'macd':
+            lines = results['macd'].columns(close)
+            _line(ax, x, lines['MACD'], width, label='MACD', linewidth=0.9)
+            _line(ax, x, lines['Signal'], width, label='Signal', linewidth=0.9)
+            _trades(ax, x, results['macd'], y=lines['MACD'])
+            ax.set_title(f'{symbol} MACD')
+        else:
+            for name, result in results.items():
+                _line(ax, x, result.total, width, label=LABELS[name])
+            if close is not None:
+                # figure2's hold curve: the first bar's budget kept in the stock
+                shares = np.floor(first.budget / close[0])
+                _line(ax, x, close * shares - first.budget, width, label='Hold')
+            ax.set_ylabel('Profit')
+            ax.set_title(f'{symbol} backtest')
+        ax.legend(loc='lower right', fontsize=8)
+    axes[-1, 0].set_xlabel('Date')
+    # fixed margins: tight_layout would cost a second full draw
+    fig.subplots_adjust(left=0.08, right=0.98, bottom=0.45 / fig.get_figheight(),
+                        top=1 - 0.3 / fig.get_figheight(), hspace=0.25)
+    image = f'{symbol}.png'
+    fig.savefig(os.path.join(out, image), dpi=80)
+
+    row = {'symbol': symbol, 'image': image, 'bars': len(first)}
+    for name, result in results.items():
+        row[name] = result.final
+        row[f'{name}_trades'] = len(result.trades)
+    return row
+
+
+def write_index(rows, out, title='Backtest report'):
+    rows = sorted(rows, key=lambda r: -max(r.get(s, -np.inf) for s in STRATEGIES))
+    headers = ['Symbol', 'Bars'] + [h for s in STRATEGIES for h in (LABELS[s], 'Trades')]
+    head = ''.join(f'<th>{h}</th>' for h in headers)
+    body = []
+    for r in rows:
+        symbol = html.escape(r['symbol'])
+        cells = [f'<a href="#{symbol}">{symbol}</a>', f"{r['bars']:,}"]
+        for s in STRATEGIES:
+            cells += [f"{r[s]:,.0f}" if s in r else '', str(r.get(f'{s}_trades', ''))]
+        body.append('<tr>' + ''.join(f'<td>{c}</td>' for c in cells) + '</tr>')
+    figures = ''.join(f'<h2 id="{html.escape(r["symbol"])}">{html.escape(r["symbol"])}</h2>'
+                      f'<img src="{html.escape(r["image"])}" loading="lazy">' for r in rows)
+    page = (f'<!doctype html><html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            '<style>body{font-family:sans-serif}td,th{padding:2px 10px;text-align:right}</style></head>'
+            f'<body><h1>{html.escape(title)}</h1><table><tr>{head}</tr>{"".join(body)}</table>{figures}</body></html>')
+    path = os.path.join(out, 'index.html')
+    with open(path, 'w') as f:
+        f.write(page)
+    return path
+
+
+def render(results_dir, out='report', workers=None, width=1000, store_root='price_store'):
+    found = find_results(results_dir)
+    os.makedirs(out, exist_ok=True)
+    if store_root and not os.path.isdir(store_root):
+        store_root = None  # no local prices: equity curves only
+    rows = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(render_symbol, s, paths, out, width, store_root): s for s, paths in found.items()}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                rows.append(future.result())
+            except Exception as e:
+                print(f"Error rendering {futures[future]}: {e}")
+            if done % 50 == 0 or done == len(futures):
+                print(f"{done}/{len(futures)} symbols, {time.perf_counter() - started:.1f}s")
+    return write_index(rows, out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render an HTML/PNG report of backtest results')
+    parser.add_argument('results_dir', nargs='?', default='.')
+    parser.add_argument('--out', default='report')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--width', type=int, default=1000, help='points per line after decimation')
+    parser.add_argument('--store', default='price_store', help='price store with the closes')
+    args = parser.parse_args()
+    print(f"Wrote {render(args.results_dir, args.out, args.workers, args.width, args.store)}")
+
+
+if __name__ == "__main__":
+    main()
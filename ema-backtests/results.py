@@ -0,0 +1,110 @@
+# RESULTS
+# Compact, read-only backtest results. Instead of a dozen per-bar columns added
+# to the caller's DataFrame, a result keeps the equity curve (Total) as float32
+# and the trades as a small structured array of events; the full utils.py
+# columns are rebuilt from the closes only when asked for. Results are saved as
+# uncompressed .npz files (a few arrays plus a JSON header).
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from core import crossover_arrays, macd_arrays
+
+STRATEGIES = {'crossover': crossover_arrays, 'macd': macd_arrays}
+LABELS = {'crossover': 'Crossover', 'macd': 'MACD'}  # all_tests.csv column names
+
+BUY, SELL = 1, -1
+TRADE_DTYPE = np.dtype([('bar', 'i4'), ('side', 'i1'), ('price', 'f8'), ('shares', 'i8')])
+
+
+def _trades(out):
+    buys = np.flatnonzero(~np.isnan(out['Buy']))
+    sells = np.flatnonzero(~np.isnan(out['Sell']))
+    trades = np.empty(len(buys) + len(sells), TRADE_DTYPE)
+    trades['bar'] = np.concatenate([buys, sells])
+    trades['side'] = np.concatenate([np.full(len(buys), BUY), np.full(len(sells), SELL)])
+    trades['price'] = np.concatenate([out['Buy'][buys], out['Sell'][sells]])
+    trades['shares'] = np.concatenate([out['Stocks_To_Buy'][buys], out['Stocks_To_Sell'][sells]])
+    return trades[np.argsort(trades['bar'], kind='stable')]
+
+
+class BacktestResult:
+    def __init__(self, strategy, params, budget, dates, total, trades, final, symbol=None):
+        self.strategy = strategy
+        self.params = params
+        self.budget = budget
+        self.dates = dates
+        self.total = total
+        self.trades = trades
+        self.final = final  # last Total at full precision
+        self.symbol = symbol
+        for array in (dates, total, trades):
+            array.flags.writeable = False
+
+    def __len__(self):
+        return len(self.total)
+
+    def __repr__(self):
+        return (f"BacktestResult({self.symbol or ''} {self.strategy} {self.params}, "
+                f"{len(self)} bars, {len(self.trades)} trades, total {self.final:.2f})")
+
+    @property
+    def buys(self):
+        return self.trades[self.trades['side'] == BUY]
+
+    @property
+    def sells(self):
+        return self.trades[self.trades['side'] == SELL]
+
+    def equity(self):
+        # Total as a float32 Series indexed by date
+        return pd.Series(self.total, index=pd.Index(self.dates, name='Date'), name='Total')
+
+    def trade_frame(self):
+        trades = pd.DataFrame(self.trades)
+        trades.insert(0, 'Date', self.dates[trades['bar']])
+        trades['side'] = np.where(trades['side'] == BUY, 'buy', 'sell')
+        return trades
+
+    def columns(self, close):
+        # every per-bar column of utils.multiple_emas / utils.macd, recomputed from the closes
+        return STRATEGIES[self.strategy](np.asarray(close, dtype=np.float64), self.budget, **self.params)
+
+    def frame(self, df):
+        # a new DataFrame with df's columns plus the full strategy columns; df is left untouched
+        out = df.copy()
+        for name, values in self.columns(df['Close']).items():
+            out[name] = values
+        return out
+
+    def save(self, path):
+        header = {'strategy': self.strategy, 'params': self.params, 'budget': self.budget,
+                  'final': self.final, 'symbol': self.symbol}
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, header=np.array(json.dumps(header)), dates=self.dates,
+                     total=self.total, trades=self.trades)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            header = json.loads(str(f['header']))
+            return cls(header['strategy'], header['params'], header['budget'], f['dates'],
+                       f['total'], f['trades'], header['final'], header['symbol'])
+
+
+def backtest(close, budget, strategy='crossover', dates=None, symbol=None, **params):
+    # run one strategy over a close series (Series, array or list) without touching it
+    if dates is None:
+        dates = close.index if isinstance(close, pd.Series) else np.arange(len(close))
+    dates = np.array(dates)  # a copy, the result marks it read-only
+    if dates.dtype.kind == 'M':
+        dates = dates.astype('datetime64[D]')
+    out = STRATEGIES[strategy](np.asarray(close, dtype=np.float64), budget, **params)
+    return BacktestResult(strategy, params, budget, dates, out['Total'].astype(np.float32),
+                          _trades(out), float(out['Total'][-1]) if len(out['Total']) else 0.0, symbol)
@@ -0,0 +1,111 @@
+# ROBUSTNESS
+# How much of a backtest result is luck: the crossover and MACD strategies are
+# run over thousands of resampled price paths and the distribution of their
+# final Total, max drawdown and trade count is compared with the historical run.
+#
+#   python robustness.py BHARTIARTL [--paths 10000] [--method bootstrap|gbm] [--block 20]
+#
+# Paths are built from the symbol's own daily log returns, either by stitching
+# random blocks of them together (block bootstrap, keeps volatility clustering)
+# or by geometric Brownian motion with the historical drift and volatility.
+# Paths are generated and evaluated a chunk at a time as a (path x time) array,
+# each chunk in one compiled pass of core.crossover_paths / core.macd_paths, so
+# memory stays at chunk x bars floats however many paths are asked for.
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from core import crossover_paths, macd_paths
+
+STRATEGIES = {'crossover': crossover_paths, 'macd': macd_paths}
+STATS = ['total', 'max_drawdown', 'trades']
+
+
+def block_bootstrap(close, n_paths, rng=None, block=20):
+    # paths of len(close) starting at close[0] from circular blocks of historical log returns
+    rng = rng or np.random.default_rng()
+    returns = np.diff(np.log(close))
+    n = len(returns)
+    n_blocks = -(-n // block)
+    starts = rng.integers(0, n, (n_paths, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block)).reshape(n_paths, -1)[:, :n] % n
+    return _prices(close[0], returns[idx])
+
+
+def gbm_paths(close, n_paths, rng=None):
+    # geometric Brownian motion with the drift and volatility of the historical log returns
+    rng = rng or np.random.default_rng()
+    returns = np.diff(np.log(close))
+    steps = rng.normal(returns.mean(), returns.std(ddof=1), (n_paths, len(returns)))
+    return _prices(close[0], steps)
+
+
+def _prices(start, log_returns):
+    paths = np.empty((len(log_returns), log_returns.shape[1] + 1))
+    paths[:, 0] = start
+    np.cumsum(log_returns, axis=1, out=paths[:, 1:])
+    np.exp(paths[:, 1:], out=paths[:, 1:])
+    paths[:, 1:] *= start
+    return paths
+
+
+def simulate(close, budget=100000, n_paths=10000, method='bootstrap', block=20, chunk=1000, seed=1,
+             strategies=STRATEGIES):
+    # {strategy: (n_paths, 3) array of total, max_drawdown, trades}
+    close = np.asarray(close, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    out = {name: np.empty((n_paths, len(STATS))) for name in strategies}
+    for lo in range(0, n_paths, chunk):
+        hi = min(lo + chunk, n_paths)
+        if method == 'bootstrap':
+            paths = block_bootstrap(close, hi - lo, rng, block)
+        else:
+            paths = gbm_paths(close, hi - lo, rng)
+        for name, run in strategies.items():
+            out[name][lo:hi] = run(paths, budget)
+    return out
+
+
+def summarize(stats, historical=None, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    # one row per strategy and statistic: mean, quantiles, and where the historical run ranks
+    rows = []
+    for name, values in stats.items():
+        for k, stat in enumerate(STATS):
+            column = values[:, k]
+            row = {'strategy': name, 'stat': stat, 'mean': column.mean()}
+            row.update({f'q{int(q * 100):02d}': v for q, v in zip(quantiles, np.quantile(column, quantiles))})
+            if stat == 'total':
+                row['p_loss'] = float(np.mean(column < 0))
+            if historical is not None:
+                row['historical'] = historical[name][k]
+                row['historical_pct'] = float(np.mean(column <= historical[name][k]))
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main():
+    from data import open_store
+    parser = argparse.ArgumentParser(description='Monte Carlo robustness of the crossover and MACD backtests')
+    parser.add_argument('symbol')
+    parser.add_argument('--paths', type=int, default=10000)
+    parser.add_argument('--method', choices=['bootstrap', 'gbm'], default='bootstrap')
+    parser.add_argument('--block', type=int, default=20, help='bootstrap block length in bars')
+    parser.add_argument('--chunk', type=int, default=1000, help='paths evaluated per pass')
+    parser.add_argument('--budget', type=float, default=100000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    df = open_store().read(args.symbol, datetime(2010, 1, 1), datetime(2024, 2, 1))
+    close = df['Close'].dropna().to_numpy()
+    historical = {name: run(close[None, :], args.budget)[0] for name, run in STRATEGIES.items()}
+    stats = simulate(close, args.budget, args.paths, args.method, args.block, args.chunk, args.seed)
+    table = summarize(stats, historical)
+    table.to_csv(f'robustness_{args.symbol}.csv', index=False)
+    with pd.option_context('display.width', 160, 'display.max_columns', 20):
+        print(table)
+
+
+if __name__ == "__main__":
+    main()
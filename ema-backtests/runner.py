@@ -0,0 +1,163 @@
+# RUNNER
+# Backtest the crossover and MACD strategies over a whole universe of symbols.
+#
+#   python runner.py [--universe ../symbols.csv] [--fetchers 16] [--workers N] [--out results]
+#
+# Prices are prefetched through the price store on a thread pool (the downloads
+# are I/O bound) and every symbol is handed to a process pool as soon as its
+# bars arrive, so fetching and backtesting overlap. Results are streamed into
+# Parquet as each symbol finishes, one row group per symbol:
+#   equity.parquet  symbol, strategy, date, total (float32)
+#   trades.parquet  symbol, strategy, date, side, price, shares
+#   summary.csv     final totals per symbol, the same shape as all_tests.csv
+# With --npz every result is also saved as <strategy>_<symbol>.npz for report.py.
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data import open_store, stock_list
+from results import BUY, LABELS, STRATEGIES, backtest
+
+
+def load_symbol(store, symbol, start, end):
+    df = store.read(symbol, start, end)
+    if not len(df) or 'Close' not in df.columns:
+        return symbol, None, None
+    close = np.asarray(df['Close'], dtype=np.float64)
+    valid = ~np.isnan(close)
+    return symbol, df.index.values[valid].astype('datetime64[D]'), close[valid]
+
+
+def run_symbol(symbol, dates, close, budget):
+    # compact result of every strategy for one symbol
+    return {name: backtest(close, budget, name, dates, symbol) for name in STRATEGIES}
+
+
+class ResultWriter:
+    # appends one row group per symbol to equity.parquet and trades.parquet
+    def __init__(self, root, npz=False):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.npz = npz
+        self.equity = pq.ParquetWriter(os.path.join(root, 'equity.parquet'), pa.schema([
+            ('symbol', pa.string()), ('strategy', pa.string()),
+            ('date', pa.date32()), ('total', pa.float32()),
+        ]))
+        self.trades = pq.ParquetWriter(os.path.join(root, 'trades.parquet'), pa.schema([
+            ('symbol', pa.string()), ('strategy', pa.string()), ('date', pa.date32()),
+            ('side', pa.string()), ('price', pa.float64()), ('shares', pa.int64()),
+        ]))
+        self.summary = []
+
+    def write(self, results):
+        pa = self.pa
+        equity, fills, row = [], [], {}
+        for name, result in results.items():
+            symbol, dates, total, trades = result.symbol, result.dates, result.total, result.trades
+            row.update(Symbol=symbol, Bars=len(result))
+            equity.append(pa.table({
+                'symbol': pa.array([symbol] * len(total), pa.string()),
+                'strategy': pa.array([name] * len(total), pa.string()),
+                'date': pa.array(dates, pa.date32()),
+                'total': pa.array(total, pa.float32()),
+            }))
+            fills.append(pa.table({
+                'symbol': pa.array([symbol] * len(trades), pa.string()),
+                'strategy': pa.array([name] * len(trades), pa.string()),
+                'date': pa.array(dates[trades['bar']], pa.date32()),
+                'side': pa.array(np.where(trades['side'] == BUY, 'buy', 'sell'), pa.string()),
+                'price': pa.array(trades['price'], pa.float64()),
+                'shares': pa.array(trades['shares'], pa.int64()),
+            }))
+            row[LABELS[name]] = result.final
+            if self.npz:
+                result.save(os.path.join(self.root, f'{name}_{symbol}.npz'))
+        self.equity.write_table(pa.concat_tables(equity))
+        self.trades.write_table(pa.concat_tables(fills))
+        self.summary.append(row)
+
+    def close(self):
+        self.equity.close()
+        self.trades.close()
+        summary = pd.DataFrame(self.summary)
+        summary.to_csv(os.path.join(self.root, 'summary.csv'), index=False)
+        return summary
+
+
+def run(symbols, start, end, budget=100000, out='results', fetchers=16, workers=None, store=None, npz=False):
+    store = store or open_store()
+    writer = ResultWriter(out, npz)
+    started = time.perf_counter()
+    reported = 0.0
+    fetched = done = bars = failed = 0
+    with ThreadPoolExecutor(max_workers=fetchers) as io_pool, \
+            ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as cpu_pool:
+        fetches = {io_pool.submit(load_symbol, store, s, start, end): s for s in symbols}
+        pending = set(fetches)
+        try:
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future in fetches:
+                        try:
+                            symbol, dates, close = future.result()
+                        except Exception as e:
+                            print(f"Error loading data for {fetches[future]}: {e}")
+                            symbol, close = fetches[future], None
+                        if close is None or not len(close):
+                            failed += 1
+                            continue
+                        fetched += 1
+                        pending.add(cpu_pool.submit(run_symbol, symbol, dates, close, budget))
+                        continue
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        print(f"Error backtesting a symbol: {e}")
+                        failed += 1
+                        continue
+                    writer.write(results)
+                    done += 1
+                    bars += len(next(iter(results.values())))
+                elapsed = time.perf_counter() - started
+                if elapsed - reported >= 1 or not pending:
+                    reported = elapsed
+                    print(f"{fetched} fetched, {done + failed}/{len(symbols)} done ({failed} skipped), "
+                          f"{done / elapsed:.1f} symbols/s, {bars / elapsed:,.0f} bars/s")
+        finally:
+            summary = writer.close()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest the EMA crossover and MACD strategies over many symbols')
+    parser.add_argument('--universe', default=None, help='csv with a Symbol column, e.g. ../symbols.csv')
+    parser.add_argument('--symbols', nargs='+', default=None)
+    parser.add_argument('--start', default='2010-01-01')
+    parser.add_argument('--end', default='2024-02-01')
+    parser.add_argument('--budget', type=float, default=100000)
+    parser.add_argument('--fetchers', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='results')
+    parser.add_argument('--npz', action='store_true', help='also save each result as .npz for report.py')
+    args = parser.parse_args()
+
+    if args.universe:
+        symbols = pd.read_csv(args.universe)['Symbol'].dropna().tolist()
+    else:
+        symbols = args.symbols or stock_list
+    summary = run(symbols, datetime.fromisoformat(args.start), datetime.fromisoformat(args.end),
+                  args.budget, args.out, args.fetchers, args.workers, npz=args.npz)
+    print(summary.describe())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# STREAMING
+# Bar-by-bar versions of the crossover and MACD strategies. Each strategy keeps
+# only a handful of numbers as state (the EWM values, the position flags, the
+# last buy price and the share/cash book), so a new bar is processed in O(1)
+# instead of recomputing 15 years of history. The state is a plain dict that
+# round-trips through JSON, so a daily job can pick up where the last run left:
+#
+#   python streaming.py BHARTIARTL ICICIBANK [--state-dir stream_state]
+#
+# The numbers match core.py / utils.py bar for bar, first-bar quirk included.
+import abc
+import argparse
+import json
+import math
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+NAN = float('nan')
+
+
+class Ewm:
+    # pandas' ewm(span, adjust=False).mean() one value at a time (see core._ewm_kernel)
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 1.0 / (1.0 + (span - 1) / 2)
+        self.weighted = None
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x):
+        is_obs = x == x
+        if self.weighted is None:
+            self.weighted = x
+        elif self.weighted == self.weighted:
+            self.old_wt *= 1.0 - self.alpha
+            if is_obs:
+                if self.weighted != x:
+                    self.weighted = self.old_wt * self.weighted + self.alpha * x
+                    self.weighted /= self.old_wt + self.alpha
+                self.old_wt = 1.0
+        elif is_obs:
+            self.weighted = x
+        if is_obs:
+            self.nobs += 1
+        return self.weighted if self.nobs > 0 else NAN
+
+    def state(self):
+        return {'span': self.span, 'weighted': self.weighted, 'old_wt': self.old_wt, 'nobs': self.nobs}
+
+    @classmethod
+    def from_state(cls, state):
+        ewm = cls(state['span'])
+        ewm.weighted, ewm.old_wt, ewm.nobs = state['weighted'], state['old_wt'], state['nobs']
+        return ewm
+
+
+class Book:
+    # Stocks_To_Buy .. Total of utils.py, one bar at a time
+    def __init__(self, budget):
+        self.budget = budget
+        self.bars = 0
+        self.assets = 0
+        self.cash = 0.0
+        self.last_buy_shares = None
+
+    def update(self, close, side):
+        bought, sold = side == 'buy', side == 'sell'
+        shares = math.floor(self.budget / close) if bought else 0
+        if bought:
+            self.last_buy_shares = shares
+            profit = -close * shares
+        elif sold and self.last_buy_shares is not None:
+            shares = self.last_buy_shares
+            profit = close * shares
+        else:
+            profit = 0.0
+        if self.bars > 0:  # utils never books the first bar
+            self.assets += shares if bought else -shares
+            self.cash += profit
+        self.bars += 1
+        return shares, self.cash + self.assets * close
+
+    def state(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_state(cls, state):
+        book = cls(state['budget'])
+        vars(book).update(state)
+        return book
+
+
+class Strategy(abc.ABC):
+    kind = None
+
+    def __init__(self, budget):
+        self.book = Book(budget)
+        self.prev_buy_value = NAN
+        self.last_date = None
+
+    @abc.abstractmethod
+    def signal(self, close):
+        # 'buy', 'sell' or None for the next close, updating the strategy's own state
+        ...
+
+    def update(self, close, date=None):
+        # process one bar: {'date', 'close', 'side' ('buy', 'sell' or None), 'shares', 'total'}
+        side = self.signal(close)
+        if side == 'buy':
+            self.prev_buy_value = close
+        shares, total = self.book.update(close, side)
+        self.last_date = date
+        return {'date': date, 'close': close, 'side': side, 'shares': shares, 'total': total}
+
+    def run(self, closes, dates=None):
+        # feed a block of bars, e.g. the history before going live
+        dates = dates if dates is not None else [None] * len(closes)
+        return [self.update(float(c), d) for c, d in zip(closes, dates)]
+
+    def state(self):
+        return {'kind': self.kind, 'prev_buy_value': self.prev_buy_value,
+                'last_date': self.last_date, 'book': self.book.state()}
+
+    def _restore(self, state):
+        self.prev_buy_value = state['prev_buy_value']
+        self.last_date = state['last_date']
+        self.book = Book.from_state(state['book'])
+
+
+class CrossoverStrategy(Strategy):
+    kind = 'crossover'
+
+    def __init__(self, budget, short=5, middle=20, long=60):
+        super().__init__(budget)
+        self.short, self.middle, self.long = Ewm(short), Ewm(middle), Ewm(long)
+        self.flag_long = False
+        self.flag_short = False
+
+    def signal(self, close):
+        short, middle, long = self.short.update(close), self.middle.update(close), self.long.update(close)
+        flat = not self.flag_long and not self.flag_short
+        if middle < long and short < middle and flat:
+            self.flag_short = True
+            return 'buy'
+        if self.flag_short and short > middle and self.prev_buy_value < close:
+            self.flag_short = False
+            return 'sell'
+        if middle > long and short > middle and flat:
+            self.flag_long = True
+            return 'buy'
+        if self.flag_long and short < middle and self.prev_buy_value < close:
+            self.flag_long = False
+            return 'sell'
+        return None
+
+    def state(self):
+        state = super().state()
+        state.update(ewm=[e.state() for e in (self.short, self.middle, self.long)],
+                     flag_long=self.flag_long, flag_short=self.flag_short)
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        strategy = cls(state['book']['budget'], *(e['span'] for e in state['ewm']))
+        strategy.short, strategy.middle, strategy.long = (Ewm.from_state(e) for e in state['ewm'])
+        strategy.flag_long, strategy.flag_short = state['flag_long'], state['flag_short']
+        strategy._restore(state)
+        return strategy
+
+
+class MacdStrategy(Strategy):
+    kind = 'macd'
+
+    def __init__(self, budget, fast=12, slow=26, signal=9):
+        super().__init__(budget)
+        self.fast, self.slow, self.signal_line = Ewm(fast), Ewm(slow), Ewm(signal)
+        self.bought = False
+
+    def signal(self, close):
+        macd = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal_line.update(macd)
+        if macd > signal and not self.bought:
+            self.bought = True
+            return 'buy'
+        if macd < signal and self.bought and close > self.prev_buy_value:
+            self.bought = False
+            return 'sell'
+        return None
+
+    def state(self):
+        state = super().state()
+        state.update(ewm=[e.state() for e in (self.fast, self.slow, self.signal_line)], bought=self.bought)
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        strategy = cls(state['book']['budget'], *(e['span'] for e in state['ewm']))
+        strategy.fast, strategy.slow, strategy.signal_line = (Ewm.from_state(e) for e in state['ewm'])
+        strategy.bought = state['bought']
+        strategy._restore(state)
+        return strategy
+
+
+STRATEGIES = {'crossover': CrossoverStrategy, 'macd': MacdStrategy}
+
+
+def from_state(state):
+    return STRATEGIES[state['kind']].from_state(state)
+
+
+def save_state(strategy, path):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(strategy.state(), f)
+    os.replace(tmp, path)
+
+
+def load_state(path):
+    with open(path) as f:
+        return from_state(json.load(f))
+
+
+def main():
+    from data import open_store
+    parser = argparse.ArgumentParser(description='Feed the latest bars to the streaming strategies')
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--state-dir', default='stream_state')
+    parser.add_argument('--start', default='2010-01-01', help='history start for a symbol seen for the first time')
+    parser.add_argument('--budget', type=float, default=100000)
+    args = parser.parse_args()
+
+    store = open_store()
+    end = datetime.today()
+    for symbol in args.symbols:
+        for kind, cls in STRATEGIES.items():
+            path = os.path.join(args.state_dir, f'{symbol}.{kind}.json')
+            strategy = load_state(path) if os.path.exists(path) else cls(args.budget)
+            if strategy.last_date:
+                start = datetime.fromisoformat(strategy.last_date) + timedelta(days=1)
+            else:
+                start = datetime.fromisoformat(args.start)
+            df = store.read(symbol, start, end)
+            events = strategy.run(df['Close'].to_numpy(), [str(d.date()) for d in df.index])
+            save_state(strategy, path)
+            if events:
+                last = events[-1]
+                print(f"{symbol} {kind}: {len(events)} new bars, {last['date']} {last['side'] or 'hold'} "
+                      f"{last['shares'] or ''} @ {last['close']:.2f}, total {last['total']:.2f}")
+
+if __name__ == "__main__":
+    main()
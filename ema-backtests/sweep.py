@@ -0,0 +1,179 @@
+# SWEEP
+# Parameter sweep of the crossover and MACD strategies over many symbols.
+#
+#   python sweep.py --short 3 5 8 --middle 13 20 34 --long 50 60 100 \
+#                   --fast 8 12 --slow 21 26 --signal 5 9 --keep 3
+#
+# All close series are copied once into a shared memory block and a process pool
+# takes one symbol per task, so each worker maps the prices instead of receiving
+# a pickled copy. Within a symbol every EWM span (and every MACD line) is
+# computed once and reused by all combinations that need it. Only summary
+# metrics are kept for every combination, plus the equity curves of the best
+# `keep` combinations per symbol and strategy.
+import argparse
+import heapq
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from core import crossover_from_lines, ewm_mean, macd_from_lines
+
+CROSSOVER_GRID = {'short': [5], 'middle': [20], 'long': [60]}
+MACD_GRID = {'fast': [12], 'slow': [26], 'signal': [9]}
+
+
+def crossover_combos(grid):
+    return [c for c in itertools.product(grid['short'], grid['middle'], grid['long']) if c[0] < c[1] < c[2]]
+
+
+def macd_combos(grid):
+    return [c for c in itertools.product(grid['fast'], grid['slow'], grid['signal']) if c[0] < c[1]]
+
+
+def metrics(total, budget, buy):
+    # equity starts at the budget; drawdown is measured on budget + Total
+    equity = budget + total
+    peak = np.maximum.accumulate(equity)
+    return {
+        'total': float(total[-1]),
+        'max_drawdown': float(np.min(equity / peak - 1)),
+        'trades': int(np.count_nonzero(~np.isnan(buy))),
+    }
+
+
+def sweep_symbol(close, budget, crossover_grid, macd_grid, keep=3):
+    # (rows, best) for one symbol; best maps strategy -> [(total, params, float32 curve)]
+    ewms = {}
+
+    def ewm(span):
+        if span not in ewms:
+            ewms[span] = ewm_mean(close, span)
+        return ewms[span]
+
+    rows, best = [], {'crossover': [], 'macd': []}
+
+    def record(strategy, params, out):
+        row = {'strategy': strategy, 'params': params, **metrics(out['Total'], budget, out['Buy'])}
+        rows.append(row)
+        item = (row['total'], params, out['Total'].astype(np.float32))
+        if len(best[strategy]) < keep:
+            heapq.heappush(best[strategy], item)
+        elif item[0] > best[strategy][0][0]:
+            heapq.heapreplace(best[strategy], item)
+
+    for short, middle, long in crossover_combos(crossover_grid):
+        record('crossover', (short, middle, long),
+               crossover_from_lines(close, ewm(short), ewm(middle), ewm(long), budget))
+
+    macd_lines = {}
+    for fast, slow, signal in macd_combos(macd_grid):
+        if (fast, slow) not in macd_lines:
+            macd_lines[fast, slow] = ewm(fast) - ewm(slow)
+        line = macd_lines[fast, slow]
+        record('macd', (fast, slow, signal), macd_from_lines(close, line, ewm_mean(line, signal), budget))
+
+    for strategy in best:
+        best[strategy] = sorted(best[strategy], key=lambda item: -item[0])
+    return rows, best
+
+
+# shared prices
+
+_shared = {}
+
+
+def _attach(name, offsets, symbols):
+    block = shared_memory.SharedMemory(name=name)
+    prices = np.ndarray(int(offsets[-1]), np.float64, block.buf)
+    prices.flags.writeable = False
+    _shared.update(block=block, prices=prices, offsets=offsets, symbols=symbols)
+
+
+def _run_symbol(k, budget, crossover_grid, macd_grid, keep):
+    offsets = _shared['offsets']
+    close = _shared['prices'][offsets[k]:offsets[k + 1]]
+    rows, best = sweep_symbol(close, budget, crossover_grid, macd_grid, keep)
+    symbol = _shared['symbols'][k]
+    for row in rows:
+        row['symbol'] = symbol
+    return symbol, rows, best
+
+
+def run(closes, budget=100000, crossover_grid=CROSSOVER_GRID, macd_grid=MACD_GRID, keep=3, workers=None):
+    # closes: {symbol: close array}; returns (summary DataFrame, {symbol: best curves})
+    symbols = list(closes)
+    offsets = np.concatenate([[0], np.cumsum([len(closes[s]) for s in symbols])]).astype(np.int64)
+    block = shared_memory.SharedMemory(create=True, size=max(int(offsets[-1]) * 8, 1))
+    prices = np.ndarray(int(offsets[-1]), np.float64, block.buf)
+    for k, s in enumerate(symbols):
+        prices[offsets[k]:offsets[k + 1]] = closes[s]
+    del prices
+
+    rows, best = [], {}
+    started = time.perf_counter()
+    combos = len(crossover_combos(crossover_grid)) + len(macd_combos(macd_grid))
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_attach,
+                                 initargs=(block.name, offsets, symbols)) as pool:
+            futures = [pool.submit(_run_symbol, k, budget, crossover_grid, macd_grid, keep)
+                       for k in range(len(symbols))]
+            for done, future in enumerate(as_completed(futures), 1):
+                symbol, symbol_rows, symbol_best = future.result()
+                rows += symbol_rows
+                best[symbol] = symbol_best
+                elapsed = time.perf_counter() - started
+                print(f"{done}/{len(symbols)} symbols, {done * combos / elapsed:.0f} runs/s")
+    finally:
+        block.close()
+        block.unlink()
+
+    summary = pd.DataFrame(rows)
+    if len(summary):
+        params = pd.DataFrame(summary.pop('params').tolist(), columns=['p1', 'p2', 'p3'])
+        summary = pd.concat([summary[['symbol', 'strategy']], params, summary.drop(columns=['symbol', 'strategy'])], axis=1)
+    return summary, best
+
+
+def save_best(best, path):
+    # best equity curves as one compressed npz: <symbol>/<strategy>/<params> -> float32 Total
+    arrays = {}
+    for symbol, strategies in best.items():
+        for strategy, items in strategies.items():
+            for total, params, curve in items:
+                arrays[f"{symbol}/{strategy}/{'-'.join(map(str, params))}"] = curve
+    np.savez_compressed(path, **arrays)
+
+
+def main():
+    from data import load_closes, stock_list
+    parser = argparse.ArgumentParser(description='Parameter sweep of the EMA crossover and MACD strategies')
+    parser.add_argument('--short', type=int, nargs='+', default=[3, 5, 8])
+    parser.add_argument('--middle', type=int, nargs='+', default=[13, 20, 34])
+    parser.add_argument('--long', type=int, nargs='+', default=[50, 60, 100])
+    parser.add_argument('--fast', type=int, nargs='+', default=[8, 12])
+    parser.add_argument('--slow', type=int, nargs='+', default=[21, 26])
+    parser.add_argument('--signal', type=int, nargs='+', default=[5, 9])
+    parser.add_argument('--budget', type=float, default=100000)
+    parser.add_argument('--keep', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--symbols', nargs='+', default=None)
+    args = parser.parse_args()
+
+    closes = load_closes(args.symbols or stock_list, datetime(2010, 1, 1), datetime(2024, 2, 1))
+    summary, best = run(closes, args.budget,
+                        {'short': args.short, 'middle': args.middle, 'long': args.long},
+                        {'fast': args.fast, 'slow': args.slow, 'signal': args.signal},
+                        args.keep, args.workers)
+    summary.to_csv('sweep_summary.csv', index=False)
+    save_best(best, 'sweep_best_curves.npz')
+    print(summary.sort_values('total', ascending=False).groupby('strategy').head(5))
+
+
+if __name__ == "__main__":
+    main()
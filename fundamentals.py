@@ -0,0 +1,140 @@
+# FUNDAMENTALS
+# The quote-summary fields of Yahoo quote pages (P/E, market cap, EPS, ...),
+# fetched concurrently through the pooled downloader and cached on disk per
+# symbol for `ttl` seconds, so screens repeated within a day make no requests.
+#
+#   fundamentals = Fundamentals(downloader)
+#   fields, failed = fundamentals.get_many(['TCS.NS', 'INFY.NS'])
+#   fields['TCS.NS']['PE Ratio (TTM)']
+#
+# Only the quote-summary block is parsed: the page text is searched for its id
+# and a stdlib streaming parser is fed from there, in chunks, until the block's
+# closing </div>, instead of building a tree of the whole page. A page without
+# the block is cached as None (the symbol has no summary); request failures are
+# not cached.
+import json
+import os
+import tempfile
+import threading
+import time
+from html.parser import HTMLParser
+
+QUOTE_URL = 'https://finance.yahoo.com'
+CACHE_ROOT = 'fundamentals'
+CHUNK = 16384
+
+
+class _QuoteSummaryParser(HTMLParser):
+    # collects the text of every <tr>'s cells inside <div id="quote-summary">
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.depth = 0  # div nesting inside the summary, 0 outside it
+        self.found = self.done = False
+        self.rows = []
+        self._row = self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if self.depth == 0:
+            if tag == 'div' and ('id', 'quote-summary') in attrs:
+                self.depth = 1
+                self.found = True
+            return
+        if tag == 'div':
+            self.depth += 1
+        elif tag == 'tr':
+            self._row = []
+        elif tag in ('td', 'th') and self._row is not None:
+            self._cell = []
+            self._row.append(self._cell)
+
+    def handle_endtag(self, tag):
+        if self.depth == 0 or self.done:
+            return
+        if tag == 'div':
+            self.depth -= 1
+            self.done = self.depth == 0
+        elif tag == 'tr' and self._row is not None:
+            self.rows.append([''.join(cell) for cell in self._row])
+            self._row = None
+        elif tag in ('td', 'th'):
+            self._cell = None
+
+    def handle_data(self, data):
+        # what BeautifulSoup's get_text(strip=True) gives: stripped strings joined
+        if self._cell is not None and data.strip():
+            self._cell.append(data.strip())
+
+
+def parse_quote_summary(text):
+    # {label: value} from the quote-summary rows with exactly two cells, None without the block
+    at = text.find('quote-summary')
+    if at < 0:
+        return None
+    parser = _QuoteSummaryParser()
+    pos = max(text.rfind('<', 0, at), 0)
+    while pos < len(text) and not parser.done:
+        parser.feed(text[pos:pos + CHUNK])
+        pos += CHUNK
+    if not parser.found:
+        return None
+    return {row[0]: row[1] for row in parser.rows if len(row) == 2}
+
+
+class Fundamentals:
+    def __init__(self, downloader, root=CACHE_ROOT, ttl=24 * 60 * 60, base_url=QUOTE_URL):
+        self.downloader = downloader
+        self.root = root
+        self.ttl = ttl
+        self.base_url = base_url.rstrip('/')
+        self.fetched = self.cached = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, symbol):
+        return os.path.join(self.root, f'{symbol}.json')
+
+    def cached_fields(self, symbol):
+        # (hit, fields) from disk if younger than ttl; fields is None for a page without a summary
+        try:
+            with open(self._path(symbol)) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False, None
+        if time.time() - entry['fetched'] > self.ttl:
+            return False, None
+        return True, entry['fields']
+
+    def _save(self, symbol, fields):
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'fetched': time.time(), 'fields': fields}, f)
+        os.replace(tmp, self._path(symbol))
+
+    def fetch(self, symbol):
+        url = f"{self.base_url}/quote/{symbol}?p={symbol}&.tsrc=fin-srch"
+        fields = parse_quote_summary(self.downloader.get(url).text)
+        if fields is not None:
+            fields = {'symbol': symbol, **fields}
+        self._save(symbol, fields)
+        with self._lock:
+            self.fetched += 1
+        return fields
+
+    def get(self, symbol):
+        hit, fields = self.cached_fields(symbol)
+        if hit:
+            with self._lock:
+                self.cached += 1
+            return fields
+        return self.fetch(symbol)
+
+    def get_many(self, symbols):
+        # ({symbol: fields or None}, {symbol: exception}); only stale or missing symbols are requested
+        return self.downloader.map(self.get, symbols)
+
+    def clear(self):
+        for name in os.listdir(self.root):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.root, name))
@@ -0,0 +1,198 @@
+# INDICATORS
+# One memoized cache of technical indicators shared by every strategy. A node is
+# (series, indicator, params) where a series is a (symbol, column) pair at a given
+# version; each node is computed once per series version and kept in an LRU under
+# a memory budget. Indicators can ask for other nodes (MACD reuses the two EMAs,
+# its signal line reuses MACD), so strategies that need overlapping indicators
+# pay for them once.
+#
+#   engine = IndicatorEngine()
+#   ind = engine.bind('TCS.NS', df)             # version defaults to a data fingerprint
+#   ind.get('Adj Close', 'sma', window=150)     # pd.Series on df's index
+#   ind.require([('Close', 'rsi', {'timeperiod': 14}), ('Close', 'ema', {'span': 20})])
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+INDICATORS = {}
+
+
+def indicator(name):
+    # register func(ctx, **params) -> array (or tuple of arrays) as an indicator
+    def register(func):
+        INDICATORS[name] = func
+        return func
+    return register
+
+
+@indicator('sma')
+def _sma(ctx, window):
+    return pd.Series(ctx.values).rolling(window=window).mean().to_numpy()
+
+
+@indicator('ema')
+def _ema(ctx, span):
+    # utils.py's ewm(span, adjust=False)
+    return pd.Series(ctx.values).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+@indicator('rolling_min')
+def _rolling_min(ctx, window):
+    return pd.Series(ctx.values).rolling(window=window, min_periods=1).min().to_numpy()
+
+
+@indicator('rolling_max')
+def _rolling_max(ctx, window):
+    return pd.Series(ctx.values).rolling(window=window, min_periods=1).max().to_numpy()
+
+
+@indicator('pct_change')
+def _pct_change(ctx):
+    return pd.Series(ctx.values).pct_change().to_numpy()
+
+
+@indicator('macd')
+def _macd(ctx, fast=12, slow=26):
+    return ctx.get('ema', span=fast) - ctx.get('ema', span=slow)
+
+
+@indicator('macd_signal')
+def _macd_signal(ctx, fast=12, slow=26, signal=9):
+    return pd.Series(ctx.get('macd', fast=fast, slow=slow)).ewm(span=signal, adjust=False).mean().to_numpy()
+
+
+@indicator('rsi')
+def _rsi(ctx, timeperiod=14):
+    import talib
+    return talib.RSI(ctx.values, timeperiod=timeperiod)
+
+
+@indicator('talib_macd')
+def _talib_macd(ctx, fastperiod=12, slowperiod=26, signalperiod=9):
+    import talib
+    return talib.MACD(ctx.values, fastperiod=fastperiod, slowperiod=slowperiod, signalperiod=signalperiod)
+
+
+def fingerprint(values):
+    # version of a series that has none: a digest of its bytes
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    return hashlib.blake2b(values.tobytes(), digest_size=12).hexdigest()
+
+
+def _nbytes(value):
+    return sum(v.nbytes for v in value) if isinstance(value, tuple) else value.nbytes
+
+
+def _freeze(value):
+    value = tuple(np.asarray(v) for v in value) if isinstance(value, tuple) else np.asarray(value)
+    for array in value if isinstance(value, tuple) else (value,):
+        array.flags.writeable = False  # cached arrays are shared, nobody may write to them
+    return value
+
+
+class _Context:
+    # what an indicator function sees: the series values and access to other nodes
+    def __init__(self, engine, series, values):
+        self.engine = engine
+        self.series = series
+        self.values = values
+
+    def get(self, name, **params):
+        return self.engine._node(self.series, name, params)
+
+
+class IndicatorEngine:
+    def __init__(self, max_bytes=256 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._series = {}  # (symbol, column) -> (version, values)
+        self._nodes = OrderedDict()  # (symbol, column, version, indicator, params) -> array(s)
+        self._lock = threading.RLock()
+
+    def add(self, symbol, column, values, version=None):
+        # register a series; a new version drops every node of the old one
+        values = np.asarray(values, dtype=np.float64)
+        version = fingerprint(values) if version is None else version
+        key = (symbol, column)
+        with self._lock:
+            held = self._series.get(key)
+            if held is not None and held[0] == version:
+                return version
+            if held is not None:
+                for node in [n for n in self._nodes if n[:2] == key]:
+                    self.nbytes -= _nbytes(self._nodes.pop(node))
+            values = values.view()
+            values.flags.writeable = False
+            self._series[key] = (version, values)
+        return version
+
+    def get(self, symbol, column, name, **params):
+        return self._node((symbol, column), name, params)
+
+    def _node(self, series, name, params):
+        with self._lock:
+            version, values = self._series[series]
+            key = (*series, version, name, tuple(sorted(params.items())))
+            if key in self._nodes:
+                self.hits += 1
+                self._nodes.move_to_end(key)
+                return self._nodes[key]
+            self.misses += 1
+            value = _freeze(INDICATORS[name](_Context(self, series, values), **params))
+            self._nodes[key] = value
+            self.nbytes += _nbytes(value)
+            self._evict(keep=key)
+            return value
+
+    def _evict(self, keep):
+        while self.nbytes > self.max_bytes and len(self._nodes) > 1:
+            oldest = next(iter(self._nodes))
+            if oldest == keep:
+                self._nodes.move_to_end(oldest)
+                continue
+            self.nbytes -= _nbytes(self._nodes.pop(oldest))
+            self.evictions += 1
+
+    def bind(self, symbol, df, version=None):
+        return BoundFrame(self, symbol, df, version)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+            self._nodes.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {'nodes': len(self._nodes), 'series': len(self._series), 'bytes': self.nbytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class BoundFrame:
+    # one symbol's DataFrame attached to an engine; results come back as Series on df's index
+    def __init__(self, engine, symbol, df, version=None):
+        self.engine = engine
+        self.symbol = symbol
+        self.df = df
+        self.version = version
+        self._added = set()
+
+    def _series(self, column):
+        if column not in self._added:
+            self.engine.add(self.symbol, column, self.df[column].to_numpy(), self.version)
+            self._added.add(column)
+        return self.symbol, column
+
+    def get(self, column, name, **params):
+        value = self.engine._node(self._series(column), name, params)
+        if isinstance(value, tuple):
+            return tuple(pd.Series(v, index=self.df.index, copy=False) for v in value)
+        return pd.Series(value, index=self.df.index, name=f'{name}_{column}', copy=False)
+
+    def require(self, needs):
+        # {(column, indicator, params as tuple): Series} for a strategy's declared needs
+        return {(column, name, tuple(sorted(params.items()))): self.get(column, name, **params)
+                for column, name, params in needs}
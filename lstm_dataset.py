@@ -0,0 +1,51 @@
+# LSTM DATASET
+# Sliding-window inputs for the LSTM forecaster without python loops or copies.
+# Closes live in one contiguous float32 buffer; numpy consumers get the windows
+# as a strided view of it (sliding_window_view) and training streams batches
+# through tf.data, gathering each batch's windows from the same buffer.
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def close_buffer(values):
+    # any series/array of prices as a contiguous 1-D float32 buffer
+    return np.ascontiguousarray(np.asarray(values, dtype=np.float32).ravel())
+
+
+def windows(values, window):
+    # x[k] = values[k:k + window], y[k] = values[k + window]; x is a read-only view
+    values = close_buffer(values)
+    x = sliding_window_view(values, window)[:-1]
+    y = values[window:]
+    return x, y
+
+
+def split_index(dates, valid_days=365, valid_start=None):
+    # first validation row: bars from valid_start on (default: the last valid_days) are held out
+    dates = pd.DatetimeIndex(pd.to_datetime(np.asarray(dates)))
+    if valid_start is None:
+        valid_start = dates[-1] - pd.Timedelta(days=valid_days)
+    return int(dates.searchsorted(pd.Timestamp(valid_start), 'left'))
+
+
+def make_dataset(values, window, start=None, stop=None, batch_size=32, shuffle=False,
+                 prefetch=None, seed=1):
+    # tf.data batches of (x, y) whose targets are values[start:stop]
+    import tensorflow as tf
+    values = close_buffer(values)
+    start = window if start is None else max(start, window)
+    stop = len(values) if stop is None else stop
+    buffer = tf.constant(values)
+    offsets = tf.range(-window, 0, dtype=tf.int64)
+
+    def gather(idx):
+        x = tf.gather(buffer, idx[:, None] + offsets)[..., None]
+        y = tf.gather(buffer, idx)
+        return x, y
+
+    ds = tf.data.Dataset.range(start, stop)
+    if shuffle:
+        ds = ds.shuffle(stop - start, seed=seed)
+    ds = ds.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE if prefetch is None else prefetch)
@@ -0,0 +1,179 @@
+# MARKET DATA
+# Shared data-access layer for StockStream. Every (symbols, start, end) window is
+# downloaded once per process, concurrent identical requests from different
+# Streamlit sessions wait on the same download, and finished windows are kept in
+# a TTL'd cache so reruns (e.g. changing the chart type) never hit the network.
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+import decimate
+from returns_engine import PricePanel
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+class YahooProvider:
+    # the real provider, same call StockStream used to make directly
+    def download(self, symbols, start, end):
+        import yfinance as yf  # imported lazily so the fake provider works without it
+        return yf.download(list(symbols), start, end)
+
+
+class FakeProvider:
+    # offline provider with deterministic random-walk prices, for local testing.
+    # Each walk starts at 100 on EPOCH and a window is a slice of it, so a ticker
+    # has the same prices whatever window it is asked for
+    EPOCH = pd.Timestamp('2000-01-03')
+
+    def __init__(self, delay=0.0, seed=0):
+        self.delay = delay
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def download(self, symbols, start, end):
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        dates = pd.bdate_range(min(self.EPOCH, pd.Timestamp(start)), end, inclusive='left', name='Date')
+        keep = dates >= pd.Timestamp(start)
+        dates = dates[keep]
+        frames = {}
+        for symbol in symbols:
+            # one stream per symbol and field, so the first n draws do not depend on how many follow
+            code = sum(map(ord, symbol))
+            rng = [np.random.default_rng([self.seed, code, field]) for field in range(3)]
+            close = (100 * np.exp(np.cumsum(rng[0].normal(0.0005, 0.02, len(keep)))))[keep]
+            spread = np.abs(rng[1].normal(0, 0.01, len(keep)))[keep] * close
+            frames[symbol] = pd.DataFrame({
+                'Open': close - spread / 2,
+                'High': close + spread,
+                'Low': close - spread,
+                'Close': close,
+                'Adj Close': close,
+                'Volume': rng[2].integers(10_000, 1_000_000, len(keep))[keep].astype(float),
+            }, index=dates)
+        frame = pd.concat(frames, axis=1).swaplevel(axis=1)
+        return frame.reindex(columns=FIELDS, level=0)
+
+
+class MarketWindow:
+    # one downloaded window; returns/close/volume are views computed on first use
+    def __init__(self, frame):
+        self.frame = frame
+        self._panel = None
+        self._returns = None
+        self._charts = {}  # (series, width) -> decimated frame
+
+    @property
+    def close(self):
+        return self.frame['Adj Close']
+
+    @property
+    def volume(self):
+        return self.frame['Volume']
+
+    @property
+    def panel(self):
+        # adjusted close as an aligned (time x ticker) array for the returns engine
+        if self._panel is None:
+            self._panel = PricePanel.from_frame(self.close)
+        return self._panel
+
+    @property
+    def returns(self):
+        # cumulative relative return of the adjusted close, same as StockStream's old relativeret
+        if self._returns is None:
+            self._returns = self.panel.to_frame(self.panel.cumulative_returns())
+        return self._returns
+
+    def chart(self, name, width):
+        # returns/close/volume decimated to about width points, kept so reruns reuse them
+        key = (name, width)
+        if key not in self._charts:
+            self._charts[key] = decimate.decimate_frame(getattr(self, name), width)
+        return self._charts[key]
+
+
+class MarketDataCache:
+    def __init__(self, provider=None, ttl=15 * 60, max_entries=64):
+        self.provider = provider or YahooProvider()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fetches = 0
+        self._entries = OrderedDict()  # key -> (expires_at, MarketWindow)
+        self._inflight = {}  # key -> Future shared by every caller waiting on that key
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(symbols, start, end):
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        return tuple(sorted(set(symbols))), str(start), str(end)
+
+    def get(self, symbols, start, end, on_fetch=None):
+        # on_fetch(window) runs only when this call did the download, not on hits or shared waits
+        key = self._key(symbols, start, end)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[1]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            # another session is already downloading this window
+            return future.result()
+
+        try:
+            frame = self.provider.download(list(key[0]), start, end)
+            window = MarketWindow(frame)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self.fetches += 1
+            # yfinance returns an empty frame when a download fails; those are not kept, so the next rerun retries
+            if not frame.dropna(how='all').empty:
+                self._entries[key] = (time.monotonic() + self.ttl, window)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            del self._inflight[key]
+        future.set_result(window)
+        if on_fetch is not None:
+            on_fetch(window)
+        return window
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _default_provider():
+    # STOCKSTREAM_FAKE_DATA=1 runs the whole app against the offline provider
+    if os.environ.get('STOCKSTREAM_FAKE_DATA'):
+        return FakeProvider()
+    return YahooProvider()
+
+
+# module level so every Streamlit session in this process shares it
+cache = MarketDataCache(_default_provider())
+
+
+def get_window(symbols, start, end, on_fetch=None):
+    return cache.get(symbols, start, end, on_fetch)
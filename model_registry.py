@@ -0,0 +1,135 @@
+# MODEL REGISTRY
+# Fitted forecasting models kept on disk so a Streamlit rerun does not retrain.
+# Entries live under <root>/<ticker>/<hyperparameter hash>/ and hold the Keras
+# model, the fitted MinMaxScaler and the training series they were fitted on.
+#
+# lookup() compares the current training series with the stored one:
+#   'hit'   same data and hyperparameters, the stored model is used as is
+#   'warm'  the stored series is the current one minus a few new bars at the
+#           end (the start may have slid forward), so the caller fine-tunes the
+#           stored model on just those bars
+#   'miss'  anything else, train from scratch, also when the stored files do not load
+#
+# Several sessions may save the same ticker at once, so every save writes its
+# files under names of its own and only publishes them through meta.json.
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import uuid
+
+import numpy as np
+
+
+def params_hash(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def data_hash(dates, values):
+    h = hashlib.sha1()
+    h.update(np.asarray(dates, dtype='datetime64[D]').tobytes())
+    h.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+class Entry:
+    def __init__(self, status, model=None, scaler=None, new_bars=0):
+        self.status = status  # 'hit', 'warm' or 'miss'
+        self.model = model
+        self.scaler = scaler
+        self.new_bars = new_bars  # bars at the end of the series the model has not seen
+
+
+class ModelRegistry:
+    def __init__(self, root='model_registry', max_new_bars=20):
+        self.root = root
+        self.max_new_bars = max_new_bars
+
+    def _dir(self, ticker, params):
+        return os.path.join(self.root, ticker.replace('/', '_'), params_hash(params))
+
+    def _meta(self, path):
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def lookup(self, ticker, params, dates, values):
+        path = self._dir(ticker, params)
+        meta = self._meta(path)
+        if meta is None:
+            return Entry('miss')
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        values = np.asarray(values, dtype=np.float64)
+
+        try:
+            if meta['data_hash'] == data_hash(dates, values):
+                return Entry('hit', *self._load(path, meta))
+            stored = np.load(os.path.join(path, meta['series']))
+            stored_dates, stored_values = stored['dates'], stored['values']
+        except Exception as e:
+            # a missing or corrupt file: retraining saves a fresh entry over it
+            print(f"Error loading the stored model for {ticker}: {e}")
+            return Entry('miss')
+
+        # warm start: every stored bar still present with the same value, only new bars after it
+        new_bars = int(np.count_nonzero(dates > stored_dates[-1]))
+        overlap = dates[dates <= stored_dates[-1]]
+        if not 0 < new_bars <= self.max_new_bars or len(overlap) == 0:
+            return Entry('miss')
+        pos = np.searchsorted(stored_dates, overlap)
+        if np.any(stored_dates[pos] != overlap):
+            return Entry('miss')
+        if not np.allclose(stored_values[pos], values[:len(overlap)]):
+            return Entry('miss')  # history was revised (splits, adjustments)
+        try:
+            return Entry('warm', *self._load(path, meta), new_bars=new_bars)
+        except Exception as e:
+            print(f"Error loading the stored model for {ticker}: {e}")
+            return Entry('miss')
+
+    def _load(self, path, meta):
+        from keras.models import load_model
+        model = load_model(os.path.join(path, meta['model']))
+        with open(os.path.join(path, meta['scaler']), 'rb') as f:
+            scaler = pickle.load(f)
+        return model, scaler
+
+    def save(self, ticker, params, dates, values, model, scaler):
+        path = self._dir(ticker, params)
+        os.makedirs(path, exist_ok=True)
+        old = self._meta(path)
+        version = (old or {}).get('version', 0) + 1
+        tag = f'{version}.{uuid.uuid4().hex[:12]}'  # another session may be saving the same version
+        meta = {
+            'ticker': ticker,
+            'params': params,
+            'version': version,
+            'data_hash': data_hash(dates, values),
+            'rows': int(len(values)),
+            'model': f'model.{tag}.keras',
+            'scaler': f'scaler.{tag}.pkl',
+            'series': f'series.{tag}.npz',
+        }
+        model.save(os.path.join(path, meta['model']))
+        with open(os.path.join(path, meta['scaler']), 'wb') as f:
+            pickle.dump(scaler, f)
+        np.savez(os.path.join(path, meta['series']),
+                 dates=np.asarray(dates, dtype='datetime64[D]'), values=np.asarray(values, dtype=np.float64))
+
+        # meta.json is written last and swapped in atomically, so a crash never
+        # leaves an entry pointing at half-written files
+        fd, tmp = tempfile.mkstemp(dir=path, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, 'meta.json'))
+
+        if old is not None:
+            # files of a save that lost the race to meta.json stay behind, unreferenced
+            for key in ('model', 'scaler', 'series'):
+                try:
+                    os.remove(os.path.join(path, old[key]))
+                except OSError:
+                    pass
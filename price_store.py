@@ -0,0 +1,178 @@
+# PRICE STORE
+# On-disk OHLCV store: one Fortran-ordered float64 .npy block per symbol (every
+# column contiguous, so a column read is a zero-copy mmap view) plus a .npy date
+# index. A small JSON manifest per symbol records the date range already held and
+# which block version is current; rewriting the manifest with os.replace is the
+# commit point, so readers never see a half-written symbol.
+#
+# Only the missing head/tail of a requested range is fetched from the provider.
+# A provider is any callable fetch(symbol, start, end) returning a DataFrame of
+# daily bars indexed by date with start <= date < end. It raises when the
+# request fails; an empty frame means the range has no bars (a weekend, a
+# holiday, dates before the listing) and is recorded as held like any other.
+import datetime
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+def _day(value):
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+
+def yahoo_fetch(symbol, start, end, interval='1d'):
+    import yfinance as yf
+    # Ticker.history rather than yf.download: download keeps its results in module-level
+    # state, so concurrent calls from the downloader's threads would overwrite each other
+    # raise_errors: a failed request raises instead of coming back as an empty frame
+    df = yf.Ticker(symbol).history(start=start, end=end, interval=interval, auto_adjust=False,
+                                   raise_errors=True)
+    if df.index.tz is not None:  # exchange-local timestamps; keep the local session date
+        df.index = df.index.tz_localize(None)
+    return df[[c for c in COLUMNS if c in df.columns]]
+
+
+class PriceStore:
+    def __init__(self, root, fetch=yahoo_fetch):
+        self.root = root
+        self.fetch = fetch
+        os.makedirs(root, exist_ok=True)
+
+    # paths
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def manifest_path(self, symbol):
+        return self._path(f'{symbol}.json')
+
+    def manifest(self, symbol):
+        try:
+            with open(self.manifest_path(symbol)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def coverage(self, symbol):
+        # [start, end) date range already held for symbol, or None
+        meta = self.manifest(symbol)
+        if meta is None:
+            return None
+        return np.datetime64(meta['start'], 'D'), np.datetime64(meta['end'], 'D')
+
+    # reading
+    def read_arrays(self, symbol, start=None, end=None):
+        # zero-copy read: (dates, {column: mmap view}) for bars with start <= date < end
+        meta = self.manifest(symbol)
+        if meta is None or meta['rows'] == 0:
+            return np.array([], dtype='datetime64[D]'), {c: np.array([]) for c in (meta or {}).get('columns', [])}
+        dates = np.load(self._path(meta['dates']), mmap_mode='r')
+        block = np.load(self._path(meta['block']), mmap_mode='r')
+        lo = 0 if start is None else np.searchsorted(dates, _day(start), 'left')
+        hi = len(dates) if end is None else np.searchsorted(dates, _day(end), 'left')
+        return dates[lo:hi], {c: block[lo:hi, j] for j, c in enumerate(meta['columns'])}
+
+    def read(self, symbol, start, end):
+        # bars for [start, end) as a writable DataFrame (a copy; read_arrays is the zero-copy
+        # path), fetching only what is not on disk yet
+        self.fill(symbol, start, end)
+        dates, columns = self.read_arrays(symbol, start, end)
+        index = pd.DatetimeIndex(dates.astype('datetime64[ns]'), name='Date')
+        return pd.DataFrame({c: np.array(v) for c, v in columns.items()}, index=index)
+
+    # writing
+    def fill(self, symbol, start, end):
+        start = _day(start)
+        # never mark today or the future as held, their bars can still change
+        end = min(_day(end), np.datetime64(datetime.date.today(), 'D'))
+        if start >= end:
+            return
+        held = self.coverage(symbol)
+        if held is None:
+            missing = [(start, end)]
+        else:
+            missing = []
+            if start < held[0]:
+                missing.append((start, held[0]))
+            if end > held[1]:
+                missing.append((held[1], end))
+        if not missing:
+            return
+
+        # a failed fetch raises and nothing is recorded. An empty answer is held: every range
+        # ends before today, so its sessions are complete and it has no bars to come
+        frames = [self._fetch(symbol, a, b) for a, b in missing]
+        lo = start if held is None else min(start, held[0])
+        hi = end if held is None else max(end, held[1])
+        self._merge(symbol, frames, lo, hi)
+
+    def _fetch(self, symbol, start, end):
+        df = self.fetch(symbol, pd.Timestamp(start).to_pydatetime(), pd.Timestamp(end).to_pydatetime())
+        if df is None or len(df) == 0:
+            return None
+        df = df.copy()
+        df.index = pd.to_datetime(df.index).normalize()
+        days = df.index.values.astype('datetime64[D]')
+        return df[(days >= start) & (days < end)]
+
+    def _merge(self, symbol, frames, lo, hi):
+        meta = self.manifest(symbol)
+        parts = [f for f in frames if f is not None and len(f)]
+        if meta is not None and meta['rows']:
+            dates, columns = self.read_arrays(symbol)
+            old = pd.DataFrame({c: np.array(v) for c, v in columns.items()},
+                               index=pd.DatetimeIndex(dates.astype('datetime64[ns]')))
+            parts.insert(0, old)
+        if parts:
+            merged = pd.concat(parts)
+            merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+            columns = [c for c in COLUMNS if c in merged.columns] + \
+                      [c for c in merged.columns if c not in COLUMNS and pd.api.types.is_numeric_dtype(merged[c])]
+        else:
+            merged, columns = pd.DataFrame(), (meta or {}).get('columns', [])
+        self._write(symbol, merged, columns, lo, hi, meta)
+
+    def _atomic_save(self, name, array):
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, array)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(name))
+
+    def _write(self, symbol, merged, columns, lo, hi, old_meta):
+        version = (old_meta or {}).get('version', 0) + 1
+        block = np.asfortranarray(merged[columns].to_numpy(dtype=np.float64)) if len(merged) \
+            else np.empty((0, len(columns)), order='F')
+        dates = merged.index.values.astype('datetime64[D]') if len(merged) else np.array([], 'datetime64[D]')
+        meta = {
+            'symbol': symbol,
+            'version': version,
+            'start': str(lo),
+            'end': str(hi),
+            'rows': int(len(dates)),
+            'columns': columns,
+            'block': f'{symbol}.{version}.npy',
+            'dates': f'{symbol}.{version}.dates.npy',
+        }
+        self._atomic_save(meta['block'], block)
+        self._atomic_save(meta['dates'], dates)
+
+        # publishing the manifest is what makes the new version visible
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.manifest_path(symbol))
+
+        if old_meta is not None:
+            for name in (old_meta['block'], old_meta['dates']):
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass  # still mapped by a reader on some platforms, left for the next write
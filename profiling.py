@@ -0,0 +1,192 @@
+# PROFILING
+# Per-rerun timing for StockStream. Each section wraps its fetch / compute /
+# render stages in `stage(...)` (or decorates a function with `profiled(...)`);
+# every stage records wall time, bytes fetched and, while memory tracing is on,
+# peak traced memory. Records go to the sidebar debug panel and are appended as
+# JSON lines to a rotating log so slow tickers and regressions can be found later.
+#
+# Streamlit runs each session's script in its own thread, so the records of the
+# current rerun are thread-local. tracemalloc is process wide: it runs while any
+# session has the debug panel on (a session that stops rerunning lets go after
+# TRACE_IDLE seconds), and with several busy sessions the peaks include their
+# allocations too.
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+LOG_PATH = os.path.join('logs', 'stockstream_profile.log')
+TRACE_IDLE = 10 * 60
+
+_local = threading.local()
+_trace_lock = threading.Lock()
+_tracing = {}  # session -> time of its last rerun that asked for memory tracing
+_active = set()  # records measuring peak memory right now, in every thread
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def _get_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+            logger = logging.getLogger('stockstream.profile')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(LOG_PATH, maxBytes=5 * 1024 * 1024, backupCount=3)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            _logger = logger
+        return _logger
+
+
+class StageRecord:
+    def __init__(self, section, name, meta=None):
+        self.section = section
+        self.name = name
+        self.meta = meta or {}
+        self.seconds = 0.0
+        self.bytes = 0
+        self.peak_memory = None  # bytes, only while memory tracing is on
+        self._base = 0
+        self.error = None
+        self.depth = 0
+
+    def add_bytes(self, n):
+        self.bytes += int(n)
+
+    def as_dict(self):
+        return {
+            'section': self.section,
+            'stage': self.name,
+            'seconds': round(self.seconds, 6),
+            'bytes': self.bytes,
+            'peak_memory': self.peak_memory,
+            'error': self.error,
+            'depth': self.depth,
+            **self.meta,
+        }
+
+
+def _state():
+    if not hasattr(_local, 'records'):
+        _local.records = []
+        _local.stack = []
+        _local.started = time.perf_counter()
+        _local.trace_memory = False
+    return _local
+
+
+def start_rerun(trace_memory=False, session=None):
+    # call once at the top of the script; drops the previous rerun's records.
+    # session identifies the caller across reruns (default: the current thread)
+    state = _state()
+    state.records = []
+    state.stack = []
+    state.started = time.perf_counter()
+    state.trace_memory = trace_memory
+    session = threading.get_ident() if session is None else session
+    now = time.monotonic()
+    with _trace_lock:
+        if trace_memory:
+            _tracing[session] = now
+        else:
+            _tracing.pop(session, None)
+        for other in [s for s, seen in _tracing.items() if now - seen > TRACE_IDLE]:
+            del _tracing[other]
+        # only stop when no session wants tracing any more
+        if _tracing and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not _tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            _active.clear()
+
+
+def _fold_peak():
+    # credit the peak since the last reset to every stage measuring now; holds _trace_lock
+    peak = tracemalloc.get_traced_memory()[1]
+    for record in _active:
+        record.peak_memory = max(record.peak_memory, peak - record._base)
+
+
+def records():
+    return list(_state().records)
+
+
+def rerun_seconds():
+    return time.perf_counter() - _state().started
+
+
+@contextmanager
+def stage(section, name, **meta):
+    state = _state()
+    record = StageRecord(section, name, meta)
+    record.depth = len(state.stack)
+    if state.trace_memory:
+        with _trace_lock:
+            if tracemalloc.is_tracing():
+                # resetting the peak would lose it for the other stages measuring, so fold it into them first
+                _fold_peak()
+                tracemalloc.reset_peak()
+                record._base = tracemalloc.get_traced_memory()[0]
+                record.peak_memory = 0
+                _active.add(record)
+    state.stack.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record.error = type(e).__name__
+        raise
+    finally:
+        record.seconds = time.perf_counter() - start
+        state.stack.pop()
+        if record.peak_memory is not None:
+            with _trace_lock:
+                if record in _active:
+                    _fold_peak()
+                    _active.discard(record)
+        state.records.append(record)
+        _get_logger().info(json.dumps({'time': time.time(), **record.as_dict()}))
+
+
+def profiled(section, name=None):
+    # decorator form of stage()
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(section, name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def frame_bytes(df):
+    # in-memory size of a downloaded frame, used as "bytes fetched"
+    try:
+        return int(df.memory_usage(deep=True).sum())
+    except AttributeError:
+        return 0
+
+
+def render_panel(st):
+    # sidebar debug panel for the current rerun
+    import pandas as pd
+    rows = [r.as_dict() for r in records()]
+    total = rerun_seconds()
+    with st.sidebar.expander('Debug: rerun profile', expanded=True):
+        st.write(f'Rerun so far: {total:.3f}s')
+        if rows:
+            table = pd.DataFrame(rows)
+            st.dataframe(table)
+            # time not covered by any top-level stage (sleeps, widget code, ...)
+            covered = table.loc[table['depth'] == 0, 'seconds'].sum()
+            st.write(f'Unaccounted: {total - covered:.3f}s')
+        else:
+            st.write('No stages recorded yet.')
@@ -0,0 +1,108 @@
+# RETURNS ENGINE
+# Prices for many tickers held as one aligned (time x ticker) float64 array on a
+# shared calendar. Every measure below is a single vectorized pass over the whole
+# panel, so the comparison page scales to an index's full constituent list.
+# Missing prices (a ticker not listed yet, holidays on another exchange) are NaN.
+import numpy as np
+import pandas as pd
+
+
+def _ffill(values):
+    # forward fill along time without a python loop
+    mask = np.isnan(values)
+    idx = np.where(~mask, np.arange(len(values))[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return values[idx, np.arange(values.shape[1])]
+
+
+class PricePanel:
+    def __init__(self, dates, tickers, values):
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = list(tickers)
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        if self.values.shape != (len(self.dates), len(self.tickers)):
+            raise ValueError('values must be shaped (len(dates), len(tickers))')
+
+    @classmethod
+    def from_frame(cls, df):
+        # wide frame (dates x tickers) or a single ticker Series
+        if isinstance(df, pd.Series):
+            df = df.to_frame(df.name if df.name is not None else 'Close')
+        df = df.sort_index()
+        return cls(df.index, df.columns, df.to_numpy(dtype=np.float64))
+
+    @classmethod
+    def from_series(cls, series):
+        # {ticker: Series} on different calendars, aligned on the union of dates
+        return cls.from_frame(pd.DataFrame(series))
+
+    def to_frame(self, values):
+        return pd.DataFrame(values, index=self.dates, columns=self.tickers)
+
+    # returns
+    def simple_returns(self):
+        prices = _ffill(self.values)
+        out = np.full_like(prices, np.nan)
+        np.divide(prices[1:], prices[:-1], out=out[1:])
+        out[1:] -= 1
+        return out
+
+    def log_returns(self):
+        prices = _ffill(self.values)
+        out = np.full_like(prices, np.nan)
+        out[1:] = np.diff(np.log(prices), axis=0)
+        return out
+
+    def cumulative_returns(self):
+        # growth since each ticker's first price, 0 before it (matches (1 + r).cumprod() - 1)
+        prices = _ffill(self.values)
+        if len(prices) == 0:
+            return prices
+        valid = ~np.isnan(prices)
+        first = np.argmax(valid, axis=0)
+        base = prices[first, np.arange(prices.shape[1])]
+        out = prices / base - 1
+        out[~valid] = 0
+        return out
+
+    def rolling_returns(self, window):
+        prices = _ffill(self.values)
+        out = np.full_like(prices, np.nan)
+        if window < len(prices):
+            out[window:] = prices[window:] / prices[:-window] - 1
+        return out
+
+    # risk
+    def drawdowns(self):
+        prices = _ffill(self.values)
+        peak = np.fmax.accumulate(prices, axis=0)
+        return prices / peak - 1
+
+    def max_drawdowns(self):
+        return np.nanmin(self.drawdowns(), axis=0)
+
+    def correlation(self, returns=None):
+        # pairwise-complete correlation of daily returns, built from matrix products
+        x = self.simple_returns() if returns is None else returns
+        m = (~np.isnan(x)).astype(np.float64)
+        x0 = np.where(m > 0, x, 0)
+        n = m.T @ m
+        sx = x0.T @ m  # sx[i, j]: sum of ticker i over rows where j is valid too
+        sxx = (x0 * x0).T @ m
+        sxy = x0.T @ x0
+        cov = n * sxy - sx * sx.T
+        spread = n * sxx - sx * sx
+        var = spread * spread.T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / np.sqrt(var)
+        corr[n < 2] = np.nan
+        return corr
+
+    def summary(self):
+        # one row per ticker, the figures the comparison page shows
+        cum = self.cumulative_returns()
+        return pd.DataFrame({
+            'Return': cum[-1] if len(cum) else np.nan,
+            'Max Drawdown': self.max_drawdowns(),
+            'Volatility': np.nanstd(self.log_returns(), axis=0) * np.sqrt(252),
+        }, index=self.tickers)
@@ -0,0 +1,108 @@
+# SCREENING
+# test2's screen as one pass over the tickers. Each ticker's daily bars are
+# loaded once, the shared conditions (trend above SMA_150 > SMA_200, distance
+# from the 52-week low/high, return against the index, P/E) are computed once,
+# and every selected strategy then runs on the bars of its timeframe, loaded
+# once per ticker and timeframe, through the same indicator cache, so screening
+# with all strategies costs about one screen.
+#
+#   register('golden_cross', golden_cross_strategy)   # func(df, indicators=...) -> (buy, sell), on weekly bars
+#   register('daily_rsi', rsi_strategy, timeframe='1d')
+#   table = screen(tickers, index_df, load_daily, load_bars, engine, strategies=['golden_cross', 'macd'])
+#
+# The result is one row per ticker: the shared metrics, whether the conditions
+# passed, and for each strategy its last buy signal date/price and target.
+import pandas as pd
+
+STRATEGIES = {}
+CONDITION_COLUMNS = ['Latest_Price', 'Score', 'Moving_avg_150', 'Moving_avg_200',
+                     'Low_52week', 'High_52week', 'Passed']
+
+
+def register(name, func=None, timeframe='1wk'):
+    # add a strategy run on `timeframe` bars under name; usable as @register('name') too
+    if func is None:
+        return lambda f: register(name, f, timeframe)
+    STRATEGIES[name] = {'func': func, 'timeframe': timeframe}
+    return func
+
+
+def total_return(df, column='Adj Close'):
+    return (df[column].pct_change() + 1).cumprod().iloc[-1]
+
+
+def conditions(stock_df, index_return, indicators):
+    # test2's shared metrics for one ticker and whether its price conditions hold
+    latest_price = stock_df['Adj Close'].iloc[-1]
+    moving_average_150 = round(indicators.get('Adj Close', 'sma', window=150), 2).iloc[-1]
+    moving_average_200 = round(indicators.get('Adj Close', 'sma', window=200), 2).iloc[-1]
+    low_52week = round(stock_df['Low'].iloc[-(52 * 5):].min(), 2)
+    high_52week = round(stock_df['High'].iloc[-(52 * 5):].max(), 2)
+    returns_compared = round(total_return(stock_df) / index_return, 2)
+    passed = bool(latest_price > moving_average_150 > moving_average_200
+                  and latest_price >= 1.3 * low_52week
+                  and latest_price >= 0.75 * high_52week)
+    return {
+        'Latest_Price': latest_price,
+        'Score': round(returns_compared * 100),
+        'Moving_avg_150': moving_average_150,
+        'Moving_avg_200': moving_average_200,
+        'Low_52week': low_52week,
+        'High_52week': high_52week,
+        'Passed': passed,
+    }
+
+
+def signal_prices(signals):
+    # golden cross returns price Series, the others the signal rows of the frame
+    return signals['Close'] if isinstance(signals, pd.DataFrame) else signals
+
+
+def signal_names(name):
+    return [f'{name}_Buy_Signal_Date', f'{name}_Buy_Signal_Price', f'{name}_Target_Price']
+
+
+def signal_columns(name, df, buying, selling):
+    buying, selling = signal_prices(buying), signal_prices(selling)
+    last = buying.index[-1] if not buying.empty else None
+    # bar frames have a RangeIndex, so report the bar's Date where there is one
+    if last is not None and 'Date' in df.columns:
+        last = df.loc[last, 'Date']
+    values = [last, buying.iloc[-1] if not buying.empty else None, selling.iloc[-1] if not selling.empty else None]
+    return dict(zip(signal_names(name), values))
+
+
+def screen(tickers, index_df, load_daily, load_bars, engine, strategies=None, check=None, plot=None):
+    # one row per ticker; strategies only run on tickers passing the price conditions and check(ticker).
+    # load_bars(ticker, timeframe) gives the frame a strategy runs on
+    names = list(STRATEGIES) if strategies is None else list(strategies)
+    index_return = total_return(index_df)
+    rows = []
+    for ticker in tickers:
+        stock_df = load_daily(ticker)
+        if stock_df is None or 'Adj Close' not in stock_df.columns:
+            continue
+        try:
+            row = {'Ticker': ticker, **conditions(stock_df, index_return, engine.bind(ticker, stock_df))}
+            if row['Passed'] and check is not None:
+                row['Passed'] = bool(check(ticker))
+            if row['Passed']:
+                frames = {}
+                for name in names:
+                    timeframe = STRATEGIES[name]['timeframe']
+                    if timeframe not in frames:
+                        bars = load_bars(ticker, timeframe)
+                        frames[timeframe] = bars, engine.bind((ticker, timeframe), bars)
+                    bars, indicators = frames[timeframe]
+                    buying, selling = STRATEGIES[name]['func'](bars, indicators=indicators)
+                    row.update(signal_columns(name, bars, buying, selling))
+                    if plot is not None:
+                        plot(ticker, name, bars, buying, selling)
+            rows.append(row)
+        except Exception as e:
+            print(f"Error processing data for {ticker}: {e}")
+
+    # every strategy gets its columns, even when no ticker passed
+    table = pd.DataFrame(rows)
+    table = table.reindex(columns=['Ticker', *CONDITION_COLUMNS] + [c for name in names for c in signal_names(name)])
+    return table.sort_values(by='Score', ascending=False)
@@ -21,15 +21,24 @@ from finta import TA
 import ta
 import sqlite3
 import talib
+import ticker_registry
+import profiling
+from model_registry import ModelRegistry
+import lstm_dataset
+import batch_forecast
 
 from millify import millify
 from annotated_text import annotated_text
 
+# fitted models shared by every session, keyed by ticker, data and hyperparameters
+models = ModelRegistry('model_registry')
+
+# window length, training batch size and validation period of the forecaster
+WINDOW_PARAMS = {'window': 60, 'epochs': 1, 'batch_size': 32, 'valid_days': 365}
+
 def run_lstm_forecasting(ticker):
-    csv = pd.read_csv('symbols.csv')
-    symbol = csv['Symbol'].tolist()
-    for i in range(0, len(symbol)):
-        symbol[i] = symbol[i] + ".NS"
+    # symbols.csv as '.NS' symbols, loaded once per process
+    nse = ticker_registry.get_nse_symbols()
 
     # Sidebar features
     feature = st.sidebar.radio(
@@ -41,69 +50,76 @@ def run_lstm_forecasting(ticker):
         # Creating sidebar
         ticker = st.selectbox(
             'Enter or Choose NSE listed Stock Symbol',
-            symbol, index=symbol.index('TRIDENT.NS'))
+            nse.symbols, index=nse.index_of('TRIDENT.NS'))
+
+        # the overnight batch job (batch_forecast.py) may already have this ticker; its
+        # estimate comes from a model shared by the ticker's group, and is only shown
+        # until the next session closes after the run
+        precomputed = batch_forecast.read_table().get(ticker)
+        if precomputed is not None and batch_forecast.is_current(precomputed):
+            st.metric(f"Group-model next-day estimate for {ticker} (data up to {precomputed['last_date']})",
+                      f" ₹ {round(float(precomputed['forecast']), 2)}")
+            st.caption('From the overnight batch, one LSTM trained on a group of tickers.')
+            if not st.checkbox(f'Fit a model for {ticker} now'):
+                return
 
         try:
             start = dt.datetime.today() - dt.timedelta(5*365)
             end = dt.datetime.today()
 
-            df = yf.download(ticker, start, end)
+            with profiling.stage('prediction', 'fetch', ticker=ticker) as rec:
+                df = yf.download(ticker, start, end)
+                rec.add_bytes(profiling.frame_bytes(df))
             df = df.reset_index()
             df['Date'] = pd.to_datetime(df['Date']).dt.date
             st.write('It will take some seconds to fit the model....')
             data = df.sort_index(ascending=True, axis=0)
-            new_data = pd.DataFrame(index=range(0, len(df)), columns=['Date', 'Close'])
-            for i in range(0, len(data)):
-                new_data['Date'][i] = data['Date'][i]
-                new_data['Close'][i] = data['Close'][i]
-
-            # setting index
-            new_data.index = new_data.Date
-            new_data.drop('Date', axis=1, inplace=True)
-
-            # creating train and test sets
-            dataset = new_data.values
-
-            train = dataset[0:987, :]
-            valid = dataset[987:, :]
-
-            # converting dataset into x_train and y_train
-            scaler = MinMaxScaler(feature_range=(0, 1))
-            scaled_data = scaler.fit_transform(dataset)
-
-            x_train, y_train = [], []
-            for i in range(60, len(train)):
-                x_train.append(scaled_data[i - 60:i, 0])
-                y_train.append(scaled_data[i, 0])
-            x_train, y_train = np.array(x_train), np.array(y_train)
-
-            x_train = np.reshape(x_train, (x_train.shape[0], x_train.shape[1], 1))
-            # create and fit the LSTM network
-            model = Sequential()
-            model.add(LSTM(units=50, return_sequences=True, input_shape=(x_train.shape[1], 1)))
-            model.add(LSTM(units=50))
-            model.add(Dense(1))
-
-            model.compile(loss='mean_squared_error', optimizer='adam')
-            model.fit(x_train, y_train, epochs=1, batch_size=1, verbose=2)
+            # one contiguous float32 buffer of closes, every window below is a view into it
+            closes = lstm_dataset.close_buffer(data['Close'])
+            dates = data['Date'].to_numpy()
+
+            # creating train and test sets: the last year is held out for validation
+            split = lstm_dataset.split_index(dates, valid_days=WINDOW_PARAMS['valid_days'])
+            train = closes[:split]
+
+            # reuse the stored model when the training bars are unchanged, or fine-tune
+            # it on the few bars that arrived since it was saved
+            params = {'model': 'lstm-2x50', **WINDOW_PARAMS}
+            window = params['window']
+            entry = models.lookup(ticker, params, dates[:split], train)
+
+            if entry.status == 'miss':
+                scaler = MinMaxScaler(feature_range=(0, 1))
+                scaler.fit(train.reshape(-1, 1))  # fitted on training bars only, so a stored scaler stays valid
+            else:
+                model, scaler = entry.model, entry.scaler
+            scaled = lstm_dataset.close_buffer(scaler.transform(closes.reshape(-1, 1)))
+
+            if entry.status == 'miss':
+                # create and fit the LSTM network
+                model = Sequential()
+                model.add(LSTM(units=50, return_sequences=True, input_shape=(window, 1)))
+                model.add(LSTM(units=50))
+                model.add(Dense(1))
+
+                model.compile(loss='mean_squared_error', optimizer='adam')
+            if entry.status != 'hit':
+                # a warm start only trains on windows ending in the new bars
+                first = window if entry.status == 'miss' else split - entry.new_bars
+                train_ds = lstm_dataset.make_dataset(scaled, window, first, split,
+                                                     batch_size=params['batch_size'], shuffle=True)
+                with profiling.stage('prediction', 'fit', ticker=ticker, cache=entry.status):
+                    model.fit(train_ds, epochs=params['epochs'], verbose=2)
+                models.save(ticker, params, dates[:split], train, model, scaler)
             st.success('Model Fitted')
-            # predicting 246 values, using past 60 from the train data
-            inputs = new_data[len(new_data) - len(valid) - 60:].values
-            inputs = inputs.reshape(-1, 1)
-            inputs = scaler.transform(inputs)
-
-            X_test = []
-            for i in range(60, inputs.shape[0]):
-                X_test.append(inputs[i - 60:i, 0])
-            X_test = np.array(X_test)
-
-            X_test = np.reshape(X_test, (X_test.shape[0], X_test.shape[1], 1))
-            closing_price = model.predict(X_test)
+            # predicting the validation bars, each from the 60 bars before it
+            X_test, _ = lstm_dataset.windows(scaled[split - window:], window)
+            closing_price = model.predict(X_test[..., None], batch_size=256)
             closing_price = scaler.inverse_transform(closing_price)
 
             # for plotting
-            train = data[:987]
-            valid = data[987:]
+            train = data[:split]
+            valid = data[split:].copy()
             valid['Predictions'] = closing_price
 
             st.write('#### Actual VS Predicted Prices')
@@ -156,9 +172,7 @@ def run_lstm_forecasting(ticker):
                 col_22.metric('Root mean squared error between predicted and actual value', round(rmse, 2))
 
             # forecasting
-            real_data = [inputs[len(inputs) - 60:len(inputs + 1), 0]]
-            real_data = np.array(real_data)
-            real_data = np.reshape(real_data, (real_data.shape[0], real_data.shape[1], 1))
+            real_data = scaled[-window:].reshape(1, window, 1)
 
             prediction = model.predict(real_data)
             prediction = scaler.inverse_transform(prediction)
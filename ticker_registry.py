@@ -0,0 +1,135 @@
+# TICKER REGISTRY
+# StockStreamTickersData.csv and symbols.csv merged and indexed once per process.
+# Every Streamlit session shares the same registry, so reruns never re-read the
+# CSVs, name <-> symbol lookups are dict hits, and search over company names and
+# symbols goes through a sorted prefix index and a trigram index instead of a
+# scan of the whole list.
+import bisect
+import functools
+import os
+import re
+import threading
+from collections import defaultdict
+
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TICKERS_CSV = os.path.join(HERE, 'StockStreamTickersData.csv')
+SYMBOLS_CSV = os.path.join(HERE, 'symbols.csv')
+
+
+def _normalize(text):
+    return re.sub(r'[^a-z0-9& ]+', ' ', str(text).lower()).strip()
+
+
+def _trigrams(text):
+    text = f'  {text} '
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TickerRegistry:
+    def __init__(self, rows):
+        # rows: iterable of (company name, yahoo symbol), first occurrence wins
+        self.name_to_symbol = {}
+        self.symbol_to_name = {}
+        for name, symbol in rows:
+            name, symbol = str(name).strip(), str(symbol).strip()
+            if not name or not symbol:
+                continue
+            self.name_to_symbol.setdefault(name, symbol)
+            self.symbol_to_name.setdefault(symbol, name)
+        self.names = tuple(self.name_to_symbol)
+        self.symbols = tuple(self.symbol_to_name)
+        self._symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        self._build_indexes()
+
+    def _build_indexes(self):
+        # prefix index: sorted (key, row id) pairs, each name keyed by itself, every
+        # word in it and its symbol, so a bisect finds all prefix matches
+        keys = []
+        self._trigram_index = defaultdict(set)
+        self._trigram_counts = []
+        for i, name in enumerate(self.names):
+            symbol = self.name_to_symbol[name]
+            norm = _normalize(name)
+            for key in {norm, *norm.split(), _normalize(symbol.split('.')[0])}:
+                keys.append((key, i))
+            grams = _trigrams(f'{norm} {_normalize(symbol)}')
+            self._trigram_counts.append(len(grams))
+            for gram in grams:
+                self._trigram_index[gram].add(i)
+        keys.sort()
+        self._prefix_keys = [k for k, _ in keys]
+        self._prefix_ids = [i for _, i in keys]
+
+    # lookups
+    def symbol_for(self, name):
+        return self.name_to_symbol.get(name)
+
+    def name_for(self, symbol):
+        return self.symbol_to_name.get(symbol)
+
+    def index_of(self, symbol, default=0):
+        # position of symbol in self.symbols, for selectbox defaults
+        return self._symbol_index.get(symbol, default)
+
+    # search
+    def prefix(self, query, limit=50):
+        query = _normalize(query)
+        if not query:
+            return []
+        lo = bisect.bisect_left(self._prefix_keys, query)
+        hi = bisect.bisect_left(self._prefix_keys, query + '\uffff')
+        ids = sorted(set(self._prefix_ids[lo:hi]))
+        return [self.names[i] for i in ids[:limit]]
+
+    def fuzzy(self, query, limit=20):
+        # names ranked by shared trigrams with the query, tolerates typos
+        grams = _trigrams(_normalize(query))
+        scores = defaultdict(int)
+        for gram in grams:
+            for i in self._trigram_index.get(gram, ()):
+                scores[i] += 1
+        # dice coefficient, so short names are not drowned out by long ones
+        ranked = sorted(scores, key=lambda i: (-2 * scores[i] / (len(grams) + self._trigram_counts[i]), i))
+        return [self.names[i] for i in ranked[:limit]]
+
+    def search(self, query, limit=20):
+        # prefix hits first, topped up with fuzzy matches
+        found = self.prefix(query, limit)
+        if len(found) < limit:
+            seen = set(found)
+            found += [n for n in self.fuzzy(query, limit) if n not in seen][:limit - len(found)]
+        return found
+
+
+class NseSymbols:
+    # the symbols.csv universe as yahoo '.NS' symbols, in file order
+    def __init__(self, symbols):
+        self.symbols = tuple(f'{s}.NS' for s in symbols)
+        self._index = {s: i for i, s in enumerate(self.symbols)}
+
+    def index_of(self, symbol, default=0):
+        return self._index.get(symbol, default)
+
+
+_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _load():
+    tickers = pd.read_csv(TICKERS_CSV, encoding='utf-8-sig', dtype=str)
+    nse = pd.read_csv(SYMBOLS_CSV, dtype=str).dropna()
+    rows = list(zip(tickers['Company Name'], tickers['Symbol']))
+    rows += list(zip(nse['Company'], nse['Symbol'] + '.NS'))
+    return TickerRegistry(rows), NseSymbols(nse['Symbol'])
+
+
+def get_registry():
+    with _lock:  # first load happens once even if several sessions start together
+        return _load()[0]
+
+
+def get_nse_symbols():
+    with _lock:
+        return _load()[1]
@@ -0,0 +1,117 @@
+# TIMEFRAMES
+# Weekly and monthly OHLCV built locally from the daily bars in a PriceStore,
+# instead of downloading every timeframe separately.
+#
+#   bars = BarBuilder(price_store)
+#   weekly = bars.frame('TCS.NS', '1wk', start=datetime.date(2010, 12, 1))   # Date column, like Yahoo's CSV
+#   dates, columns = bars.arrays('TCS.NS', '1mo')
+#
+# Sessions are grouped the way Yahoo's 1wk/1mo bars are: a week runs Monday to
+# Friday and is labelled with its Monday (even when the Monday is a holiday), a
+# month is labelled with its first calendar day, and periods without a session
+# are skipped. Open is the period's first open, High/Low the extremes, Close and
+# Adj Close the last close, Volume the sum; the current period is partial.
+# Resampled arrays are cached per (symbol, timeframe) and rebuilt only when the
+# store publishes a new version of the symbol.
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+TIMEFRAMES = ('1d', '1wk', '1mo')
+AGGREGATE = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Adj Close': 'last', 'Volume': 'sum'}
+
+
+def _day(value):
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+
+def periods(dates, timeframe):
+    # the start day of the period each date falls in
+    days = np.asarray(dates).astype('datetime64[D]')
+    if timeframe == '1d':
+        return days
+    if timeframe == '1wk':
+        return days - (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    if timeframe == '1mo':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    raise ValueError(f'unknown timeframe {timeframe!r}, expected one of {TIMEFRAMES}')
+
+
+def resample_arrays(dates, columns, timeframe, label='start'):
+    # (period dates, {column: array}) from daily (dates, {column: array}); label='last' dates a bar by its last session
+    days = np.asarray(dates).astype('datetime64[D]')
+    period = periods(days, timeframe)
+    if timeframe == '1d' or len(period) == 0:
+        return period, {name: np.array(values, dtype=np.float64) for name, values in columns.items()}
+    starts = np.flatnonzero(np.r_[True, period[1:] != period[:-1]])
+    ends = np.r_[starts[1:], len(period)] - 1
+    out = {}
+    for name, values in columns.items():
+        values = np.asarray(values, dtype=np.float64)
+        rule = AGGREGATE.get(name, 'last')
+        if rule == 'first':
+            out[name] = values[starts]
+        elif rule == 'max':
+            out[name] = np.fmax.reduceat(values, starts)
+        elif rule == 'min':
+            out[name] = np.fmin.reduceat(values, starts)
+        elif rule == 'sum':
+            out[name] = np.add.reduceat(np.nan_to_num(values), starts)
+        else:
+            out[name] = values[ends]
+    labels = period[starts] if label == 'start' else days[ends]
+    return labels, out
+
+
+class BarBuilder:
+    def __init__(self, store, max_entries=512):
+        self.store = store
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self._cache = OrderedDict()  # (symbol, timeframe, label) -> (store version, dates, columns)
+        self._lock = threading.Lock()
+
+    def arrays(self, symbol, timeframe='1d', label='start'):
+        # the symbol's whole held history in `timeframe`; arrays are shared, so read-only
+        meta = self.store.manifest(symbol)
+        version = meta and meta['version']
+        key = (symbol, timeframe, label)
+        with self._lock:
+            held = self._cache.get(key)
+            if held is not None and held[0] == version:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return held[1], held[2]
+            self.misses += 1
+        dates, columns = self.store.read_arrays(symbol)
+        dates, columns = resample_arrays(dates, columns, timeframe, label)
+        for array in (dates, *columns.values()):
+            array.flags.writeable = False
+        with self._lock:
+            self._cache[key] = (version, dates, columns)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return dates, columns
+
+    def frame(self, symbol, timeframe='1d', start=None, end=None, label='start'):
+        # bars with start <= date < end as a DataFrame with a Date column; fills the store's daily range first
+        if start is not None:
+            self.store.fill(symbol, start, end or pd.Timestamp.today())
+        dates, columns = self.arrays(symbol, timeframe, label)
+        lo, hi = 0, len(dates)
+        if start is not None:
+            first = _day(start)
+            # keep the period start falls in, not just the ones starting after it
+            lo = np.searchsorted(dates, periods([first], timeframe)[0] if label == 'start' else first)
+        if end is not None:
+            hi = np.searchsorted(dates, _day(end))
+        df = pd.DataFrame({name: values[lo:hi] for name, values in columns.items()})
+        df.insert(0, 'Date', dates[lo:hi].astype('datetime64[ns]'))
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
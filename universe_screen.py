@@ -0,0 +1,149 @@
+# UNIVERSE SCREEN
+# test2's screening conditions for the whole symbols.csv universe at once. The
+# universe is held as (date x ticker) panels of Adj Close, High and Low on one
+# calendar, and every measure is a column-wise vectorized pass over the panel:
+#
+#   condition 1   Adj Close > SMA_150 > SMA_200
+#   condition 2   Adj Close >= 1.3 x 52-week low
+#   condition 3   Adj Close >= 0.75 x 52-week high
+#   score         100 x (ticker return / ^NSEI return) over the window, as in test2
+#
+# plus an RS rating, the ticker's percentile (1-99) of relative strength across
+# the universe. The table is ranked with passing tickers first, then by score.
+# Like test2's per-ticker frames, the moving averages and 52-week range count
+# each ticker's own bars, not calendar rows, and nothing is filled over a
+# suspension. Tickers without a bar on the as-of session (suspended, delisted)
+# are left out.
+# The P/E condition is left to the per-ticker screen (screening.py), it needs a
+# page request per ticker.
+#
+#   python universe_screen.py [--universe symbols.csv] [--download] [--asof 2024-01-31] [--out universe_screen.csv]
+#
+# Bars come from test2's price store (stock_data/); --download fills missing
+# ranges first through the concurrent downloader.
+import argparse
+import datetime
+import time
+
+import numpy as np
+import pandas as pd
+
+from returns_engine import PricePanel
+
+FIELDS = ('Adj Close', 'High', 'Low')
+INDEX_SYMBOL = '^NSEI'
+WEEK52 = 52 * 5
+
+
+def load_panels(symbols, start, end, store, fields=FIELDS):
+    # {field: DataFrame (dates x symbols)} from the store's arrays on the union of their dates
+    held = {}
+    for symbol in symbols:
+        dates, columns = store.read_arrays(symbol, start, end)
+        if len(dates) and all(f in columns for f in fields):
+            held[symbol] = (dates, columns)
+    if not held:
+        return {f: pd.DataFrame() for f in fields}
+    calendar = np.unique(np.concatenate([dates for dates, _ in held.values()]))
+    panels = {f: np.full((len(calendar), len(held)), np.nan) for f in fields}
+    for j, (dates, columns) in enumerate(held.values()):
+        rows = np.searchsorted(calendar, dates)
+        for f in fields:
+            panels[f][rows, j] = columns[f]
+    index = pd.DatetimeIndex(calendar.astype('datetime64[ns]'), name='Date')
+    return {f: pd.DataFrame(values, index=index, columns=list(held)) for f, values in panels.items()}
+
+
+def total_return(prices):
+    # growth since each column's first price: what (pct_change() + 1).cumprod().iloc[-1] gives
+    return PricePanel.from_frame(prices).cumulative_returns()[-1] + 1
+
+
+def last_bars(close, n):
+    # mask of each column's own last n bars (rows where it has a price)
+    held = close.notna()
+    count = held.cumsum()
+    return held & (count > count.iloc[-1] - n)
+
+
+def own_mean(close, n):
+    # mean of each column's last n bars, NaN with fewer than n
+    window = last_bars(close, n)
+    return close.where(window).sum().where(window.sum() == n) / n
+
+
+def screen(close, high, low, index_close, asof=None):
+    # ranked table of the screening measures as of `asof` (default: the last date)
+    if asof is not None:
+        close, high, low = close.loc[:asof], high.loc[:asof], low.loc[:asof]
+        index_close = index_close.loc[:asof]
+    sma_150 = own_mean(close, 150).round(2)
+    sma_200 = own_mean(close, 200).round(2)
+    year = last_bars(close, WEEK52)
+    low_52week = low.where(year).min().round(2)
+    high_52week = high.where(year).max().round(2)
+    latest = close.iloc[-1]  # NaN for tickers without a bar on the as-of session
+
+    relative = pd.Series(total_return(close) / total_return(index_close)[0], index=close.columns)
+    returns_compared = relative.round(2)
+    table = pd.DataFrame({
+        'Latest_Price': latest,
+        'Score': (returns_compared * 100).round(),
+        'Moving_avg_150': sma_150,
+        'Moving_avg_200': sma_200,
+        'Low_52week': low_52week,
+        'High_52week': high_52week,
+        'Condition_1': (latest > sma_150) & (sma_150 > sma_200),
+        'Condition_2': latest >= 1.3 * low_52week,
+        'Condition_3': latest >= 0.75 * high_52week,
+        'Relative_Strength': relative,
+        'RS_Rating': (relative.rank(pct=True) * 98 + 1).round(),
+    })
+    table['Passed'] = table[['Condition_1', 'Condition_2', 'Condition_3']].all(axis=1)
+    table = table[latest.notna()].rename_axis('Ticker').reset_index()
+    table = table.sort_values(['Passed', 'Score'], ascending=[False, False], ignore_index=True)
+    table.insert(0, 'Rank', np.arange(1, len(table) + 1))
+    return table
+
+
+def run(symbols, start, end, store, index_symbol=INDEX_SYMBOL, asof=None):
+    panels = load_panels(list(symbols) + [index_symbol], start, end, store)
+    if index_symbol not in panels['Adj Close'].columns:
+        raise LookupError(f'no bars for the index {index_symbol}')
+    index_close = panels['Adj Close'].pop(index_symbol)
+    for field in ('High', 'Low'):
+        panels[field].pop(index_symbol)
+    return screen(panels['Adj Close'], panels['High'], panels['Low'], index_close, asof)
+
+
+def main():
+    from price_store import PriceStore
+    parser = argparse.ArgumentParser(description='Screen the whole NSE universe in vectorized passes')
+    parser.add_argument('--universe', default='symbols.csv', help='csv with a Symbol column (NSE symbols)')
+    parser.add_argument('--store', default='stock_data')
+    parser.add_argument('--days', type=int, default=1825)
+    parser.add_argument('--asof', default=None, help='screen as of this date instead of the last bar')
+    parser.add_argument('--download', action='store_true', help='fetch missing bars first')
+    parser.add_argument('--out', default='universe_screen.csv')
+    args = parser.parse_args()
+
+    symbols = [f'{s}.NS' for s in pd.read_csv(args.universe, dtype=str)['Symbol'].dropna()]
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=args.days)
+    if args.download:
+        from downloader import Downloader
+        with Downloader() as downloader:
+            store = PriceStore(args.store, fetch=downloader.history)
+            for ticker, e in downloader.prefetch(store, symbols + [INDEX_SYMBOL], start, end).items():
+                print(f"Error downloading data for {ticker}: {e}")
+    store = PriceStore(args.store)
+
+    started = time.perf_counter()
+    table = run(symbols, start, end, store, asof=args.asof)
+    table.to_csv(args.out, index=False)
+    print(table.head(25).to_string(index=False))
+    print(f"{len(table)} tickers, {int(table['Passed'].sum())} passed, {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# WALK FORWARD
+# Walk-forward evaluation of forecasting models over many tickers.
+#
+#   python walk_forward.py TCS.NS TRIDENT.NS TATAMOTORS.NS --models knn linear lstm --splits 5
+#
+# Each ticker's history is cut into consecutive test folds at the end of the
+# series; a fold trains on everything before it (expanding) or on a fixed number
+# of bars before it (rolling) and predicts each test bar one step ahead. Models
+# plug in through small adapters with fit(dates, values) / predict(dates, values,
+# start, stop). All price series are copied once into shared memory and the
+# (ticker, model, fold) tasks fan out over a process pool that maps them read-only.
+import argparse
+import datetime as dt
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import lstm_dataset
+
+
+# model adapters
+
+def _calendar_features(dates):
+    # the Year/Month/Day/DayOfWeek/DayOfYear features of model_comparison.ipynb
+    d = pd.DatetimeIndex(dates)
+    return np.column_stack([d.year, d.month, d.day, d.dayofweek, d.dayofyear]).astype(np.float64)
+
+
+class MovingAverageAdapter:
+    # baseline: mean of the previous `window` actual closes
+    name = 'moving_average'
+
+    def __init__(self, window=20):
+        self.window = window
+
+    def fit(self, dates, values):
+        pass
+
+    def predict(self, dates, values, start, stop):
+        csum = np.concatenate([[0.0], np.cumsum(values[:stop])])
+        idx = np.arange(start, stop)
+        lo = np.maximum(idx - self.window, 0)
+        return (csum[idx] - csum[lo]) / np.maximum(idx - lo, 1)
+
+
+class KNNAdapter:
+    name = 'knn'
+
+    def __init__(self, neighbors=(2, 3, 4, 5, 6, 7, 8, 9)):
+        self.neighbors = neighbors
+
+    def fit(self, dates, values):
+        from sklearn import neighbors
+        from sklearn.model_selection import GridSearchCV
+        self.model = GridSearchCV(neighbors.KNeighborsRegressor(), {'n_neighbors': list(self.neighbors)}, cv=5)
+        self.model.fit(_calendar_features(dates), values)
+
+    def predict(self, dates, values, start, stop):
+        return self.model.predict(_calendar_features(dates[start:stop]))
+
+
+class LinearAdapter:
+    name = 'linear'
+
+    def fit(self, dates, values):
+        from sklearn.linear_model import LinearRegression
+        self.model = LinearRegression().fit(_calendar_features(dates), values)
+
+    def predict(self, dates, values, start, stop):
+        return self.model.predict(_calendar_features(dates[start:stop]))
+
+
+class LSTMAdapter:
+    name = 'lstm'
+
+    def __init__(self, window=60, epochs=1, batch_size=32):
+        self.window = window
+        self.epochs = epochs
+        self.batch_size = batch_size
+
+    def fit(self, dates, values):
+        from batch_forecast import build_lstm
+        self.lo, self.span = float(values.min()), float(values.max() - values.min()) or 1.0
+        scaled = lstm_dataset.close_buffer((values - self.lo) / self.span)
+        self.model = build_lstm(self.window)
+        train_ds = lstm_dataset.make_dataset(scaled, self.window, batch_size=self.batch_size, shuffle=True)
+        self.model.fit(train_ds, epochs=self.epochs, verbose=0)
+
+    def predict(self, dates, values, start, stop):
+        # each test bar from the `window` actual bars before it
+        scaled = lstm_dataset.close_buffer((values[start - self.window:stop] - self.lo) / self.span)
+        x, _ = lstm_dataset.windows(scaled, self.window)
+        pred = self.model.predict(x[..., None], batch_size=256, verbose=0)[:, 0]
+        return pred * self.span + self.lo
+
+
+class ProphetAdapter:
+    name = 'prophet'
+
+    def fit(self, dates, values):
+        from prophet import Prophet
+        self.model = Prophet(daily_seasonality=True)
+        self.model.fit(pd.DataFrame({'ds': pd.DatetimeIndex(dates), 'y': values}))
+
+    def predict(self, dates, values, start, stop):
+        future = pd.DataFrame({'ds': pd.DatetimeIndex(dates[start:stop])})
+        return self.model.predict(future)['yhat'].to_numpy()
+
+
+ADAPTERS = {
+    'moving_average': MovingAverageAdapter,
+    'knn': KNNAdapter,
+    'linear': LinearAdapter,
+    'lstm': LSTMAdapter,
+    'prophet': ProphetAdapter,
+}
+
+
+# folds and metrics
+
+def make_folds(n, n_splits=5, test_size=60, min_train=250, mode='expanding', train_size=None):
+    # (train_start, train_stop, test_stop) with the test folds back to back at the end
+    folds = []
+    for k in range(n_splits):
+        test_stop = n - (n_splits - 1 - k) * test_size
+        train_stop = test_stop - test_size
+        train_start = 0 if mode == 'expanding' else max(0, train_stop - (train_size or min_train))
+        if train_stop - train_start >= min_train:
+            folds.append((train_start, train_stop, test_stop))
+    return folds
+
+
+def scores(actual, pred):
+    err = actual - pred
+    ss_tot = np.sum((actual - actual.mean()) ** 2)
+    return {
+        'mae': float(np.mean(np.abs(err))),
+        'rmse': float(np.sqrt(np.mean(err ** 2))),
+        'r2': float(1 - np.sum(err ** 2) / ss_tot) if ss_tot > 0 else np.nan,
+    }
+
+
+# shared read-only price buffers
+
+class SharedPrices:
+    # every ticker's dates and closes concatenated into two shared memory blocks
+    def __init__(self, series):
+        self.tickers = list(series)
+        lengths = [len(series[t][1]) for t in self.tickers]
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        total = int(self.offsets[-1])
+        self._values = shared_memory.SharedMemory(create=True, size=max(total * 8, 1))
+        self._dates = shared_memory.SharedMemory(create=True, size=max(total * 8, 1))
+        values = np.ndarray(total, np.float64, self._values.buf)
+        dates = np.ndarray(total, 'datetime64[D]', self._dates.buf)
+        for k, t in enumerate(self.tickers):
+            lo, hi = self.offsets[k], self.offsets[k + 1]
+            dates[lo:hi] = np.asarray(series[t][0], dtype='datetime64[D]')
+            values[lo:hi] = np.asarray(series[t][1], dtype=np.float64)
+        del values, dates  # drop our views so close() does not complain
+
+    def descriptor(self):
+        return self._values.name, self._dates.name, self.tickers, self.offsets
+
+    def close(self):
+        for block in (self._values, self._dates):
+            block.close()
+            block.unlink()
+
+
+_shared = {}
+
+
+def _attach(descriptor):
+    # worker initializer: map the shared blocks once, read-only
+    values_name, dates_name, tickers, offsets = descriptor
+    values_block = shared_memory.SharedMemory(name=values_name)
+    dates_block = shared_memory.SharedMemory(name=dates_name)
+    values = np.ndarray(int(offsets[-1]), np.float64, values_block.buf)
+    dates = np.ndarray(int(offsets[-1]), 'datetime64[D]', dates_block.buf)
+    values.flags.writeable = False
+    dates.flags.writeable = False
+    _shared.update(blocks=(values_block, dates_block), values=values, dates=dates,
+                   index={t: (offsets[k], offsets[k + 1]) for k, t in enumerate(tickers)})
+
+
+def _run_task(task):
+    ticker, model_name, model_kwargs, fold_no, (train_start, train_stop, test_stop) = task
+    lo, hi = _shared['index'][ticker]
+    values, dates = _shared['values'][lo:hi], _shared['dates'][lo:hi]
+    adapter = ADAPTERS[model_name](**model_kwargs)
+    row = {
+        'ticker': ticker, 'model': model_name, 'fold': fold_no,
+        'train_start': dates[train_start], 'test_start': dates[train_stop], 'test_end': dates[test_stop - 1],
+        'n_train': train_stop - train_start, 'n_test': test_stop - train_stop,
+    }
+    try:
+        started = time.perf_counter()
+        adapter.fit(dates[train_start:train_stop], values[train_start:train_stop])
+        row['fit_seconds'] = time.perf_counter() - started
+        started = time.perf_counter()
+        pred = np.asarray(adapter.predict(dates, values, train_stop, test_stop), dtype=np.float64)
+        row['predict_seconds'] = time.perf_counter() - started
+        row.update(scores(values[train_stop:test_stop], pred))
+    except Exception as e:
+        row['error'] = f'{type(e).__name__}: {e}'
+    return row
+
+
+def evaluate(series, models, n_splits=5, test_size=60, min_train=250, mode='expanding',
+             train_size=None, workers=None):
+    # series: {ticker: (dates, values)}; models: {name: adapter kwargs}
+    tasks = []
+    for ticker, (dates, values) in series.items():
+        folds = make_folds(len(values), n_splits, test_size, min_train, mode, train_size)
+        for name, kwargs in models.items():
+            tasks += [(ticker, name, kwargs, k, fold) for k, fold in enumerate(folds)]
+    workers = workers or os.cpu_count() or 1
+    shared = SharedPrices(series)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(shared.descriptor(),)) as pool:
+            rows = list(pool.map(_run_task, tasks, chunksize=max(1, len(tasks) // (8 * workers))))
+    finally:
+        shared.close()
+    return pd.DataFrame(rows)
+
+
+def load_series(tickers, years=10, store_root='stock_data'):
+    from price_store import PriceStore
+    store = PriceStore(store_root)
+    end = dt.date.today()
+    start = end - dt.timedelta(days=years * 365)
+    series = {}
+    for ticker in tickers:
+        df = store.read(ticker, start, end)
+        column = 'Adj Close' if 'Adj Close' in df.columns else 'Close'
+        closes = df[column].dropna()
+        if len(closes):
+            series[ticker] = (closes.index.values, closes.to_numpy())
+    return series
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Walk-forward evaluation of forecasting models')
+    parser.add_argument('tickers', nargs='+')
+    parser.add_argument('--models', nargs='+', default=['moving_average', 'knn', 'linear'], choices=list(ADAPTERS))
+    parser.add_argument('--splits', type=int, default=5)
+    parser.add_argument('--test-size', type=int, default=60)
+    parser.add_argument('--mode', choices=['expanding', 'rolling'], default='expanding')
+    parser.add_argument('--train-size', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='walk_forward.csv')
+    args = parser.parse_args()
+
+    series = load_series(args.tickers)
+    results = evaluate(series, {m: {} for m in args.models}, args.splits, args.test_size,
+                       mode=args.mode, train_size=args.train_size, workers=args.workers)
+    results.to_csv(args.out, index=False)
+    metrics = [c for c in ('mae', 'rmse', 'r2', 'fit_seconds', 'predict_seconds') if c in results.columns]
+    print(results.groupby('model')[metrics].mean())
+
+
+if __name__ == "__main__":
+    main()